@@ -3,10 +3,19 @@ from abc import ABC
 
 
 class AgentInterface(ABC):
+    temperature = 0.7
+    _llm = None
+
     def __init__(self, config):
         self.config = config
-        self.llm = config.get_llm()
+
+    @property
+    def llm(self):
+        """Language model client, created on first use so importing the app stays cheap"""
+        if self._llm is None:
+            self._llm = self.config.get_llm(temperature=self.temperature)
+        return self._llm
     
-    def do(self, *args, **kwargs):
-        """Main method to be implemented by subclasses"""
+    async def do(self, *args, **kwargs):
+        """Main coroutine to be implemented by subclasses"""
         raise NotImplementedError("Subclasses must implement this method.")
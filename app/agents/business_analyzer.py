@@ -1,21 +1,39 @@
+import asyncio
+import hashlib
+from typing import List, Union
+
 from app.agents.agent_interface import AgentInterface
 from app.config import Config
 from app.models.business_profile import BusinessProfile
+from app.services.cache_store import get_cache_store
+from app.services.metrics import record_cache, record_retry, timed
+from app.services.single_flight import SingleFlight
+from app.services.web_loader import WebsiteLoader
+from app.utils import backoff_delay, normalize_url
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
-from langchain_community.document_loaders import WebBaseLoader
 import logging
 
 logger = logging.getLogger(__name__)
 
 class BusinessAnalyzer(AgentInterface):
     """Analyzes business websites to extract key information"""
+    temperature = 0.2
     
     def __init__(self, config: Config):
         self.config = config
-        self.llm = config.get_llm(temperature=0.2)
-        self.character_limit = 6000
+        # hard guard only, the website loader already stops at its token budget
+        self.character_limit = 8000
         self.retry_count = 3
+        self.website_loader = WebsiteLoader(config)
+        self.profile_cache = get_cache_store(
+            config.profile_cache_backend,
+            config.profile_cache_path,
+            config.profile_cache_max_entries,
+        )
+        self.profile_flight = SingleFlight("profile_llm")
+        # identical requests arriving together share the whole fetch and analysis, including retries
+        self.url_flight = SingleFlight("profile")
 
         self.prompt = ChatPromptTemplate.from_template("""
             You are an expert business analyst and marketing professional.
@@ -49,7 +67,14 @@ class BusinessAnalyzer(AgentInterface):
         
         self.parser = PydanticOutputParser(pydantic_object=BusinessProfile)
         
-    def do(self, url: str, retry_count: int = 0, content=None) -> BusinessProfile: 
+    async def do(self, url: str, retry_count: int = 0, content=None) -> BusinessProfile: 
+        if retry_count == 0 and not content:
+            provider = self.config.get_llm_provider()
+            key = (normalize_url(url), provider.get_provider_name(), provider.get_model_name())
+            return await self.url_flight.do(key, lambda: self._do(url))
+        return await self._do(url, retry_count, content)
+
+    async def _do(self, url: str, retry_count: int = 0, content=None) -> BusinessProfile:
         provider_name = self.config.get_llm_provider().get_provider_name()
         if retry_count >= self.retry_count:
             logger.error(f"Maximum retry attempts ({self.retry_count}) exceeded for URL: {url} using {provider_name}")
@@ -57,18 +82,84 @@ class BusinessAnalyzer(AgentInterface):
 
         try:
             if not content:
-                logger.info(f"Loading website content from: {url}")
-                loader = WebBaseLoader(url)
-                docs = loader.load()
-                content = docs[0].page_content[:self.character_limit]
+                page_content = await self.website_loader.load(url)
+                content = page_content[:self.character_limit]
 
-            chain = self.prompt | self.llm | self.parser
-            result = chain.invoke({"content": content})
-            logger.info(f"Successfully extracted business profile for: {result.name} using {provider_name}")
-            return result
+            return await self._get_profile(content)
 
         except Exception as e:
             logger.warning(
                 f"Error analyzing website (attempt {retry_count + 1}/{self.retry_count}): {str(e)}"
             )
-            return self.do(url, retry_count + 1, content)
+            record_retry("business_analyzer")
+            await asyncio.sleep(backoff_delay(retry_count))
+            return await self._do(url, retry_count + 1, content)
+
+    async def do_batch(self, urls: List[str], contents: List[str]) -> List[Union[BusinessProfile, Exception]]:
+        """Profiles of many pages, cache misses go to the LLM as one batch call and failures are retried one by one"""
+        contents = [content[:self.character_limit] for content in contents]
+        keys = [self._profile_key(content) for content in contents]
+        cached = await asyncio.to_thread(lambda: [self.profile_cache.get(key) for key in keys])
+        results: List[Union[BusinessProfile, Exception, None]] = [None] * len(contents)
+        misses = []
+        for position, entry in enumerate(cached):
+            record_cache("profile", bool(entry))
+            if entry:
+                results[position] = BusinessProfile.model_validate_json(entry)
+            else:
+                misses.append(position)
+        if not misses:
+            return results
+
+        chain = self.prompt | self.llm | self.parser
+        with timed("profile_llm"):
+            outputs = await chain.abatch(
+                [{"content": contents[position]} for position in misses],
+                config={"max_concurrency": self.config.bulk_llm_concurrency},
+                return_exceptions=True,
+            )
+
+        async def settle(position: int, output) -> None:
+            if isinstance(output, Exception):
+                logger.warning(f"Batched profile analysis failed for {urls[position]}, retrying alone: {str(output)}")
+                try:
+                    output = await self._do(urls[position], 1, contents[position])
+                except Exception as e:
+                    output = e
+            else:
+                await asyncio.to_thread(
+                    self.profile_cache.set, keys[position], output.model_dump_json(), self.config.profile_cache_ttl
+                )
+            results[position] = output
+
+        await asyncio.gather(*(settle(position, output) for position, output in zip(misses, outputs)))
+        logger.info(f"Analyzed {len(misses)} website(s) in one batch, {len(contents) - len(misses)} from the cache")
+        return results
+
+    def _profile_key(self, content: str) -> str:
+        provider = self.config.get_llm_provider()
+        return hashlib.sha256(
+            f"{provider.get_provider_name()}\0{provider.get_model_name()}\0{content}".encode("utf-8")
+        ).hexdigest()
+
+    async def _get_profile(self, content: str) -> BusinessProfile:
+        """Serve the profile from the cache, concurrent misses for the same content share one LLM call"""
+        key = self._profile_key(content)
+        cached = await asyncio.to_thread(self.profile_cache.get, key)
+        record_cache("profile", bool(cached))
+        if cached:
+            result = BusinessProfile.model_validate_json(cached)
+            logger.info(f"Business profile cache hit for: {result.name}")
+            return result
+        return await self.profile_flight.do(key, lambda: self._analyze(content, key))
+
+    async def _analyze(self, content: str, key: str) -> BusinessProfile:
+        provider_name = self.config.get_llm_provider().get_provider_name()
+        chain = self.prompt | self.llm | self.parser
+        with timed("profile_llm"):
+            result = await chain.ainvoke({"content": content})
+        logger.info(f"Successfully extracted business profile for: {result.name} using {provider_name}")
+        await asyncio.to_thread(
+            self.profile_cache.set, key, result.model_dump_json(), self.config.profile_cache_ttl
+        )
+        return result
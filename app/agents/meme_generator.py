@@ -1,11 +1,15 @@
+import asyncio
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import uuid4
 
 from app.agents.agent_interface import AgentInterface
 from app.config import Config
 from app.memegenrators.meme_generator_orchestrator import get_meme_generator
 from app.models.meme_content import MemeContent
+from app.models.meme_image import MemeImageResult
+from app.services.image_store import ImageStore
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,14 +22,70 @@ class MemeImageGenerator(AgentInterface):
         self.save_dir = Path('memes')
         self.save_dir.mkdir(parents=True, exist_ok=True)
         self.generator = get_meme_generator(self.config)
+        self.image_store = ImageStore(config)
+        self.concurrency = config.meme_render_concurrency
+        # shared by every request handled by this worker
+        self.global_semaphore = asyncio.Semaphore(config.meme_render_global_concurrency)
         
-    def do(self, business_name: str, meme_content: MemeContent) -> Optional[str]:
+    async def do(self, business_name: str, meme_content: MemeContent, image_format: Optional[str] = None) -> Optional[str]:
         """Generate a meme image from the meme content using DALL·E 3 via the OpenAI image generation API"""
-        # add a timestamp to the filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = self.save_dir/f"{business_name}_{meme_content.template_name}_{timestamp}.png"
         try:
-            return self.generator.generate(business_name, meme_content, filename)
+            return await self._generate(business_name, meme_content, image_format)
         except Exception as e:
             print(f"Error generating image: {str(e)}")
             return None
+
+    async def do_many(
+        self,
+        business_name: str,
+        meme_contents: List[MemeContent],
+        concurrency: Optional[int] = None,
+        image_format: Optional[str] = None,
+    ) -> List[MemeImageResult]:
+        """Render all memes of a campaign concurrently, results are returned in input order"""
+        results: List[Optional[MemeImageResult]] = [None] * len(meme_contents)
+        async for index, result in self.iter_many(business_name, meme_contents, concurrency, image_format):
+            results[index] = result
+        return results
+
+    async def iter_many(
+        self,
+        business_name: str,
+        meme_contents: List[MemeContent],
+        concurrency: Optional[int] = None,
+        image_format: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[int, MemeImageResult]]:
+        """Render all memes of a campaign concurrently, yielding (index, result) as each one completes"""
+        limit = min(concurrency or self.concurrency, self.concurrency)
+        request_semaphore = asyncio.Semaphore(max(limit, 1))
+        try:
+            await self.generator.prepare(meme_contents)
+        except Exception as e:
+            logger.warning(f"Failed to prepare meme generation, rendering memes one by one: {str(e)}")
+
+        async def render(index: int, meme_content: MemeContent) -> Tuple[int, MemeImageResult]:
+            async with request_semaphore, self.global_semaphore:
+                try:
+                    url = await self._generate(business_name, meme_content, image_format)
+                except Exception as e:
+                    logger.error(f"Error generating image for {meme_content.template_name}: {str(e)}")
+                    return index, MemeImageResult(error=str(e))
+            if url is None:
+                return index, MemeImageResult(error="No image was generated")
+            return index, MemeImageResult(url=url, variants=self.image_store.variant_urls(url))
+
+        tasks = [asyncio.create_task(render(index, meme_content)) for index, meme_content in enumerate(meme_contents)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # the consumer went away (e.g. a streaming client disconnected), stop rendering for it
+            for task in tasks:
+                task.cancel()
+
+    async def _generate(self, business_name: str, meme_content: MemeContent, image_format: Optional[str] = None) -> Optional[str]:
+        image_format = image_format or self.config.image_format
+        # add a timestamp to the filename, the suffix keeps concurrent renders of one template apart
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = self.save_dir/f"{business_name}_{meme_content.template_name}_{timestamp}_{uuid4().hex[:8]}.{image_format}"
+        return await self.generator.generate(business_name, meme_content, filename, image_format)
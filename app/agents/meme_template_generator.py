@@ -1,5 +1,7 @@
+import asyncio
+import hashlib
 import json
-from typing import List
+from typing import Dict, List, Set, Union
 from app.agents.agent_interface import AgentInterface
 from app.config import Config
 from app.models.business_profile import BusinessProfile
@@ -8,19 +10,26 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 import logging
 
-from app.services.pinecone import PineconeClient
+from app.services.concept_pool import ConceptPool, concept_fingerprint
+from app.services.metrics import record_cache, record_retry, timed
+from app.services.single_flight import SingleFlight
+from app.utils import backoff_delay
 
 logger = logging.getLogger(__name__)
 
 class MemeCampaignGenerator(AgentInterface):
     """Generates creative meme marketing campaigns"""
+    temperature = 1.2
     
     def __init__(self, config: Config):
         self.config = config
-        self.llm = config.get_llm(temperature=1.2)
         self.retry_count = 3
-        self.llm_provider = config.get_llm_provider()
-        self.pinecone_client = PineconeClient(config)
+        self.concept_pool = ConceptPool(config.concept_pool_ttl, config.concept_pool_max_profiles)
+        self.refills = SingleFlight()
+        self.generations = SingleFlight("concepts")
+        # background refills only get a small share of the LLM capacity
+        self.refill_semaphore = asyncio.Semaphore(config.concept_pool_refill_concurrency)
+        self.refill_tasks: Set[asyncio.Task] = set()
         self.prompt = ChatPromptTemplate.from_template("""
            You are a viral marketing expert who creates memes that actually get shared and saved. 
             You understand internet culture, current trends, and what makes content relatable to real people.
@@ -95,10 +104,135 @@ class MemeCampaignGenerator(AgentInterface):
 
         self.parser = PydanticOutputParser(pydantic_object=MemeCampaign)
         
-    def do(self, business_profile: BusinessProfile, num_memes: int = 1, retry_count: int = 0) -> List[MemeContent]:
-        """Generate meme concepts based on business profile
+    async def do(self, business_profile: BusinessProfile, num_memes: int = 1) -> List[MemeContent]:
+        """Generate meme concepts based on business profile, serving pre-generated concepts first
         """
-        provider_name = self.llm_provider.get_provider_name()
+        key = self._pool_key(business_profile)
+        if not self.config.concept_pool_enabled:
+            # concurrent identical requests get the same concepts
+            return await self.generations.do(
+                (key, num_memes), lambda: self._generate(business_profile, num_memes)
+            )
+
+        memes = self.concept_pool.take(key, num_memes)
+        missing = num_memes - len(memes)
+        record_cache("concept_pool", missing <= 0)
+        if missing > 0:
+            memes.extend(await self._generate_shared(key, business_profile, missing))
+        else:
+            logger.info(f"Served {len(memes)} meme concept(s) for {business_profile.name} from the concept pool")
+
+        if self.concept_pool.size(key) < self.config.concept_pool_low_water:
+            self._schedule_refill(key, business_profile)
+        return memes
+
+    async def do_batch(
+        self, business_profiles: List[BusinessProfile], counts: List[int]
+    ) -> List[Union[List[MemeContent], Exception]]:
+        """Concepts for many profiles, pooled ones first and the rest from one batch call to the LLM"""
+        pooling = self.config.concept_pool_enabled
+        keys = [self._pool_key(profile) for profile in business_profiles]
+        results: List[Union[List[MemeContent], Exception]] = []
+        missing: Dict[int, int] = {}
+        for position, count in enumerate(counts):
+            memes = self.concept_pool.take(keys[position], count) if pooling else []
+            if pooling:
+                record_cache("concept_pool", len(memes) >= count)
+            results.append(memes)
+            if len(memes) < count:
+                missing[position] = count - len(memes)
+        if not missing:
+            return results
+
+        chain = self.prompt | self.llm | self.parser
+        with timed("campaign_llm"):
+            outputs = await chain.abatch(
+                [self._prompt_inputs(business_profiles[position], count) for position, count in missing.items()],
+                config={"max_concurrency": self.config.bulk_llm_concurrency},
+                return_exceptions=True,
+            )
+
+        async def settle(position: int, count: int, output) -> None:
+            profile = business_profiles[position]
+            if isinstance(output, Exception):
+                logger.warning(f"Batched concept generation failed for {profile.name}, retrying alone: {str(output)}")
+                try:
+                    generated = await self._generate(profile, count, 1)
+                except Exception as e:
+                    results[position] = e
+                    return
+            else:
+                generated = output.memes
+            if pooling:
+                generated = self.concept_pool.prefer_unseen(keys[position], generated)
+                self.concept_pool.mark_served(keys[position], generated[:count])
+                # the LLM sometimes returns more concepts than asked for, keep the extras
+                self.concept_pool.add(keys[position], generated[count:])
+            results[position].extend(generated[:count])
+
+        await asyncio.gather(*(settle(position, count, output) for (position, count), output in zip(missing.items(), outputs)))
+        logger.info(f"Generated concepts for {len(missing)} business profile(s) in one batch")
+        return results
+
+    async def _generate_shared(self, key: str, business_profile: BusinessProfile, missing: int) -> List[MemeContent]:
+        """Generate the missing concepts, concurrent misses for the same profile share one LLM call.
+
+        The generated concepts go through the pool so each waiter takes different ones while they last,
+        the rest get the same concepts as an earlier waiter.
+        """
+        size = max(missing, self.config.concept_pool_batch_size) if self.config.concept_coalesce_vary else missing
+        generated = await self.generations.do((key, size), lambda: self._generate_pooled(key, business_profile, size))
+        memes = self.concept_pool.take(key, missing)
+        if len(memes) < missing:
+            # the pool ran dry or the LLM repeated concepts somebody already has
+            taken = {concept_fingerprint(meme) for meme in memes}
+            reused = [meme for meme in self.concept_pool.prefer_unseen(key, generated)
+                      if concept_fingerprint(meme) not in taken]
+            memes.extend(reused[:missing - len(memes)])
+            self.concept_pool.mark_served(key, memes)
+        return memes
+
+    async def _generate_pooled(self, key: str, business_profile: BusinessProfile, size: int) -> List[MemeContent]:
+        generated = await self._generate(business_profile, size)
+        # the LLM sometimes returns more concepts than asked for, they are pooled as well
+        self.concept_pool.add(key, generated)
+        return generated
+
+    def _pool_key(self, business_profile: BusinessProfile) -> str:
+        provider = self.config.get_llm_provider()
+        key = f"{provider.get_provider_name()}\0{provider.get_model_name()}\0{business_profile.model_dump_json()}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _schedule_refill(self, key: str, business_profile: BusinessProfile):
+        task = asyncio.create_task(self.refills.do(key, lambda: self._refill(key, business_profile)))
+        # keep a reference so the task is not garbage collected mid-flight
+        self.refill_tasks.add(task)
+        task.add_done_callback(self.refill_tasks.discard)
+
+    async def _refill(self, key: str, business_profile: BusinessProfile):
+        async with self.refill_semaphore:
+            try:
+                generated = await self._generate(business_profile, self.config.concept_pool_batch_size)
+            except Exception as e:
+                logger.warning(f"Failed to refill the concept pool for {business_profile.name}: {str(e)}")
+                return
+            added = self.concept_pool.add(key, generated)
+            logger.info(f"Added {added} meme concept(s) to the pool for {business_profile.name}")
+
+    @staticmethod
+    def _prompt_inputs(business_profile: BusinessProfile, num_memes: int) -> Dict:
+        return {
+            "name": business_profile.name,
+            "industry": business_profile.industry,
+            "core_offerings": "\n".join([f"• {offering}" for offering in business_profile.core_offerings]),
+            "value_propositions": "\n".join([f"• {prop}" for prop in business_profile.value_propositions]),
+            "target_audience": "\n".join([f"• {audience}" for audience in business_profile.target_audience]),
+            "brand_tone": business_profile.brand_tone,
+            "num_memes": num_memes,
+        }
+
+    async def _generate(self, business_profile: BusinessProfile, num_memes: int = 1, retry_count: int = 0) -> List[MemeContent]:
+        provider_name = self.config.get_llm_provider().get_provider_name()
         if retry_count >= self.retry_count:
             logger.error(
                 f"Maximum retry attempts ({self.retry_count}) exceeded for {business_profile.name} "
@@ -108,23 +242,11 @@ class MemeCampaignGenerator(AgentInterface):
 
         try:
             name = business_profile.name
-            industry = business_profile.industry
-            core_offerings = "\n".join([f"• {offering}" for offering in business_profile.core_offerings])
-            value_propositions = "\n".join([f"• {prop}" for prop in business_profile.value_propositions])
-            target_audience = "\n".join([f"• {audience}" for audience in business_profile.target_audience])
-            brand_tone = business_profile.brand_tone
             logger.info(f"Generating {num_memes} meme concept(s) for {name}"f" using {provider_name} provider")
             
             chain = self.prompt | self.llm | self.parser
-            result = chain.invoke({
-                "name": name,
-                "industry": industry,
-                "core_offerings": core_offerings,
-                "value_propositions": value_propositions,
-                "target_audience": target_audience,
-                "brand_tone": brand_tone,
-                "num_memes": num_memes,
-            })
+            with timed("campaign_llm"):
+                result = await chain.ainvoke(self._prompt_inputs(business_profile, num_memes))
             
             logger.info(
                 f"Successfully generated {len(result.memes)} meme concept(s) for {name} "
@@ -135,4 +257,6 @@ class MemeCampaignGenerator(AgentInterface):
         except Exception as e:
             logger.warning(f"Error generating meme campaign using {provider_name} "
             f"(attempt {retry_count + 1}/{self.retry_count}): {str(e)}")
-            return self.do(business_profile, num_memes, retry_count + 1)
\ No newline at end of file
+            record_retry("meme_campaign_generator")
+            await asyncio.sleep(backoff_delay(retry_count))
+            return await self._generate(business_profile, num_memes, retry_count + 1)
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.agents.business_analyzer import BusinessAnalyzer
+from app.agents.meme_generator import MemeImageGenerator
+from app.agents.meme_template_generator import MemeCampaignGenerator
+from app.config import Config
+from app.models.bulk_campaign import BulkCampaignItem
+
+logger = logging.getLogger(__name__)
+
+
+class BulkCampaignPipeline:
+    """Runs many campaigns at once, batching the LLM and embedding work of several websites together.
+
+    Websites are processed in chunks. A chunk fetches its pages concurrently, analyzes them in one batch call,
+    generates all concepts in another, embeds every concept at once and then renders. Several chunks are in flight
+    so fetching and rendering overlap with the LLM calls of other chunks.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        business_analyzer: BusinessAnalyzer,
+        meme_campaign_generator: MemeCampaignGenerator,
+        meme_generator: MemeImageGenerator,
+    ):
+        self.config = config
+        self.business_analyzer = business_analyzer
+        self.meme_campaign_generator = meme_campaign_generator
+        self.meme_generator = meme_generator
+        # shared by every bulk request of this worker
+        self.fetch_semaphore = asyncio.Semaphore(config.bulk_fetch_concurrency)
+
+    async def manifest(
+        self, items: List[BulkCampaignItem], concurrency: Optional[int] = None, image_format: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """Yield one manifest entry per website as soon as it is done, in completion order, then a summary"""
+        start = time.perf_counter()
+        entries: asyncio.Queue = asyncio.Queue()
+        chunk_semaphore = asyncio.Semaphore(self.config.bulk_chunk_concurrency)
+        indexed = list(enumerate(items))
+        size = self.config.bulk_batch_size
+        chunks = [indexed[offset:offset + size] for offset in range(0, len(indexed), size)]
+
+        async def run(chunk: List[Tuple[int, BulkCampaignItem]]):
+            async with chunk_semaphore:
+                await self._run_chunk(chunk, concurrency, image_format, entries)
+
+        tasks = [asyncio.create_task(run(chunk)) for chunk in chunks]
+        summary = {"campaigns": len(items), "completed": 0, "failed": 0, "memes": 0, "meme_errors": 0}
+        try:
+            for _ in range(len(items)):
+                entry = await entries.get()
+                if entry["status"] == "completed":
+                    summary["completed"] += 1
+                    summary["memes"] += sum(1 for url in entry["meme_images"] if url)
+                    summary["meme_errors"] += sum(1 for error in entry["errors"] if error)
+                else:
+                    summary["failed"] += 1
+                yield entry
+        finally:
+            # the client went away, stop working for it
+            for task in tasks:
+                task.cancel()
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Bulk campaign finished: {summary}")
+        yield {"type": "summary", **summary}
+
+    async def _run_chunk(
+        self,
+        chunk: List[Tuple[int, BulkCampaignItem]],
+        concurrency: Optional[int],
+        image_format: Optional[str],
+        entries: asyncio.Queue,
+    ):
+        pending = dict(chunk)
+        try:
+            pages = await asyncio.gather(*(self._fetch(item.url) for _, item in chunk), return_exceptions=True)
+            fetched = []
+            for (index, item), page in zip(chunk, pages):
+                if isinstance(page, Exception):
+                    entries.put_nowait(self._failed(index, item, "fetch", page))
+                    pending.pop(index, None)
+                else:
+                    fetched.append((index, item, page))
+            if not fetched:
+                return
+
+            profiles = await self.business_analyzer.do_batch(
+                [item.url for _, item, _ in fetched], [page for _, _, page in fetched]
+            )
+            analyzed = []
+            for (index, item, _), profile in zip(fetched, profiles):
+                if isinstance(profile, Exception):
+                    entries.put_nowait(self._failed(index, item, "profile", profile))
+                    pending.pop(index, None)
+                else:
+                    analyzed.append((index, item, profile))
+            if not analyzed:
+                return
+
+            concepts = await self.meme_campaign_generator.do_batch(
+                [profile for _, _, profile in analyzed], [item.num_memes for _, item, _ in analyzed]
+            )
+            campaigns = []
+            for (index, item, profile), memes in zip(analyzed, concepts):
+                if isinstance(memes, Exception):
+                    entries.put_nowait(self._failed(index, item, "concepts", memes))
+                    pending.pop(index, None)
+                else:
+                    campaigns.append((index, item, profile, memes))
+
+            try:
+                # one encode() call for the memes of the whole chunk, the renders then hit the embedding cache
+                await self.meme_generator.generator.prepare([meme for *_, memes in campaigns for meme in memes])
+            except Exception as e:
+                logger.warning(f"Failed to prepare bulk meme generation, embedding memes per campaign: {str(e)}")
+
+            async def render(index: int, item: BulkCampaignItem, profile, memes):
+                try:
+                    results = await self.meme_generator.do_many(profile.name, memes, concurrency, image_format)
+                except Exception as e:
+                    entries.put_nowait(self._failed(index, item, "images", e))
+                    pending.pop(index, None)
+                    return
+                entries.put_nowait({
+                    "type": "campaign",
+                    "index": index,
+                    "url": item.url,
+                    "status": "completed",
+                    "business_profile": profile.model_dump(),
+                    "meme_concepts": [meme.model_dump() for meme in memes],
+                    "meme_images": [result.url for result in results],
+                    "variants": [result.variants for result in results],
+                    "errors": [result.error for result in results],
+                    "error": None,
+                })
+                pending.pop(index, None)
+
+            await asyncio.gather(*(render(*campaign) for campaign in campaigns))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Bulk campaign chunk failed: {e}")
+            for index, item in list(pending.items()):
+                entries.put_nowait(self._failed(index, item, "pipeline", e))
+                pending.pop(index, None)
+
+    async def _fetch(self, url: str) -> str:
+        async with self.fetch_semaphore:
+            return await self.business_analyzer.website_loader.load(url)
+
+    @staticmethod
+    def _failed(index: int, item: BulkCampaignItem, stage: str, error: Exception) -> Dict:
+        logger.warning(f"Bulk campaign for {item.url} failed at {stage}: {str(error)}")
+        return {"type": "campaign", "index": index, "url": item.url, "status": "failed", "stage": stage, "error": str(error)}
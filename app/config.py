@@ -11,23 +11,105 @@ class Config:
         self._setup_logging()
 
         self.llm_provider_name = os.environ.get("LLM_PROVIDER", "gemini")
+        # extra providers to hedge slow calls to and fail over to, in order of preference
+        self.llm_fallback_providers = [
+            name.strip() for name in os.environ.get("LLM_FALLBACK_PROVIDERS", "").split(",")
+            if name.strip() and name.strip() != self.llm_provider_name
+        ]
         self.llm_config = self._build_llm_config()
+        # created on first use, importing the provider SDK is slow
+        self._llm_provider = None
         
-        self.llm_provider = LLMProviderFactory.create_provider(
-            self.llm_provider_name, 
-            self.llm_config
-        )
-        
-        self.meme_generator = os.environ.get("MEME_GENERATOR", "memegen")
+        self.meme_generator = os.environ.get("MEME_GENERATOR", "memegen") # memegen, pillow or openai
+        self.memegen_base_url = os.environ.get("MEMEGEN_BASE_URL", "https://api.memegen.link").rstrip("/")
+        # used by the pillow generator to render locally
+        self.template_image_dir = os.environ.get("TEMPLATE_IMAGE_DIR", "cache/templates")
+        self.meme_font_path = os.environ.get("MEME_FONT_PATH") # defaults to Impact/DejaVu Sans Bold
         self.minio_base_url = os.environ.get("MINIO_BASE_URL", "http://localhost:9000")
         self.minio_access_key = os.environ.get("MINIO_ACCESS_KEY", "minioadmin")
         self.minio_secret_key = os.environ.get("MINIO_SECRET_KEY", "minioadmin")
         self.minio_bucket = os.environ.get("MINIO_BUCKET", "memgen")
         self.pinecone_api_key = os.environ.get("PINECONE_API_KEY", "")
         self.pinecone_index_name = os.environ.get("PINECONE_INDEX_NAME", "meme-templates")
+        self.template_index_backend = os.environ.get("TEMPLATE_INDEX_BACKEND", "local") # local or pinecone
+        self.template_index_dir = os.environ.get("TEMPLATE_INDEX_DIR", "data/template_index")
+        # template names from the LLM are looked up in the catalog first, vector search is the fallback
+        self.template_catalog_refresh = int(os.environ.get("TEMPLATE_CATALOG_REFRESH", 24 * 3600)) # seconds, 0 disables
+        self.template_fuzzy_cutoff = float(os.environ.get("TEMPLATE_FUZZY_CUTOFF", 0.85)) # difflib similarity ratio
+        # vector search candidates, one with as many text slots as the concept has texts wins if its score is within
+        # TEMPLATE_LINES_MARGIN of the best
+        self.template_match_candidates = int(os.environ.get("TEMPLATE_MATCH_CANDIDATES", 5))
+        self.template_lines_margin = float(os.environ.get("TEMPLATE_LINES_MARGIN", 0.05)) # cosine similarity
+
+        # extracted website text is cached on disk, stale entries are revalidated with ETag/Last-Modified
+        self.web_cache_dir = os.environ.get("WEB_CACHE_DIR", "cache/web")
+        self.web_cache_ttl = int(os.environ.get("WEB_CACHE_TTL", 3600)) # seconds
+        self.web_cache_max_bytes = int(os.environ.get("WEB_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        # pages are streamed and parsed until either limit is hit
+        self.web_max_bytes = int(os.environ.get("WEB_MAX_BYTES", 2 * 1024 * 1024))
+        self.web_extract_token_budget = int(os.environ.get("WEB_EXTRACT_TOKEN_BUDGET", 1500))
+
+        # business profiles are memoized per page content, provider and model
+        self.profile_cache_backend = os.environ.get("PROFILE_CACHE_BACKEND", "memory") # memory or sqlite
+        self.profile_cache_ttl = int(os.environ.get("PROFILE_CACHE_TTL", 24 * 3600)) # seconds
+        self.profile_cache_path = os.environ.get("PROFILE_CACHE_PATH", "cache/profiles.sqlite3")
+        self.profile_cache_max_entries = int(os.environ.get("PROFILE_CACHE_MAX_ENTRIES", 1024))
+
+        # pre-generated meme concepts per business profile, refilled in the background
+        self.concept_pool_enabled = os.environ.get("CONCEPT_POOL_ENABLED", "true").lower() == "true"
+        self.concept_pool_batch_size = int(os.environ.get("CONCEPT_POOL_BATCH_SIZE", 10))
+        self.concept_pool_low_water = int(os.environ.get("CONCEPT_POOL_LOW_WATER", 3))
+        self.concept_pool_ttl = int(os.environ.get("CONCEPT_POOL_TTL", 3600)) # seconds
+        self.concept_pool_max_profiles = int(os.environ.get("CONCEPT_POOL_MAX_PROFILES", 1024))
+        self.concept_pool_refill_concurrency = int(os.environ.get("CONCEPT_POOL_REFILL_CONCURRENCY", 2))
+        # identical concurrent requests share one concept generation, with this on it generates a whole pool
+        # batch so every waiter gets its own concepts instead of the same ones
+        self.concept_coalesce_vary = os.environ.get("CONCEPT_COALESCE_VARY", "false").lower() == "true"
+
+        # bulk campaigns: websites are processed in chunks, every chunk makes one batch call per LLM stage
+        self.bulk_max_campaigns = int(os.environ.get("BULK_MAX_CAMPAIGNS", 500))
+        self.bulk_batch_size = int(os.environ.get("BULK_BATCH_SIZE", 25))
+        self.bulk_chunk_concurrency = int(os.environ.get("BULK_CHUNK_CONCURRENCY", 2))
+        self.bulk_fetch_concurrency = int(os.environ.get("BULK_FETCH_CONCURRENCY", 16))
+        self.bulk_llm_concurrency = int(os.environ.get("BULK_LLM_CONCURRENCY", 8)) # in-flight calls per batch
+
+        # background campaign jobs
+        self.job_workers = int(os.environ.get("JOB_WORKERS", 4))
+        self.job_queue_size = int(os.environ.get("JOB_QUEUE_SIZE", 100))
+        # sqlite lets every worker on the host answer for every job, memory only suits a single worker
+        self.job_store_backend = os.environ.get("JOB_STORE_BACKEND", "sqlite") # sqlite or memory
+        self.job_store_path = os.environ.get("JOB_STORE_PATH", "cache/jobs.sqlite3")
+
+        # shared keep-alive HTTP connection pools, per named client
+        self.http_max_connections = int(os.environ.get("HTTP_MAX_CONNECTIONS", 100))
+        self.http_max_keepalive_connections = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+        self.http_keepalive_expiry = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", 30)) # seconds
+
+        # generated images are spooled to disk and uploaded to MinIO in the background
+        self.image_spool_dir = os.environ.get("IMAGE_SPOOL_DIR", "cache/spool")
+        self.image_base_url = os.environ.get("IMAGE_BASE_URL", "/images") # where the /images route is reachable
+        self.image_upload_workers = int(os.environ.get("IMAGE_UPLOAD_WORKERS", 4))
+        self.image_upload_queue_size = int(os.environ.get("IMAGE_UPLOAD_QUEUE_SIZE", 256))
+        self.image_upload_retries = int(os.environ.get("IMAGE_UPLOAD_RETRIES", 5))
+        # larger images are uploaded in parts of this size, 5 MiB is the S3 minimum
+        self.image_multipart_part_size = int(os.environ.get("IMAGE_MULTIPART_PART_SIZE", 5 * 1024 * 1024))
+        self.image_format = os.environ.get("IMAGE_FORMAT", "png") # png, webp or jpg, can be overridden per request
+        self.image_quality = int(os.environ.get("IMAGE_QUALITY", 80)) # webp/jpg quality of locally encoded images
+        # downscaled copies stored next to every image, as name:longest side in pixels
+        self.image_variants = os.environ.get("IMAGE_VARIANTS", "thumbnail:256,preview:640")
+
+        # max memes rendered at once for a single request, and across all requests of a worker
+        self.meme_render_concurrency = int(os.environ.get("MEME_RENDER_CONCURRENCY", 4))
+        self.meme_render_global_concurrency = int(os.environ.get("MEME_RENDER_GLOBAL_CONCURRENCY", 32))
 
         self.rate_limit_max_requests = int(os.environ.get("RATE_LIMIT", 2))
         self.rate_window = os.environ.get("RATE_WINDOW", 'hour') # day, hour, minute, second
+        # memes per window, every campaign request is charged its num_memes
+        self.rate_limit_max_memes = int(os.environ.get("RATE_LIMIT_MEMES", 10))
+        # memes per window through /meme_campaign/bulk, a separate budget sized for batch submissions
+        self.rate_limit_bulk_memes = int(os.environ.get("RATE_LIMIT_BULK_MEMES", 1000))
+        # shared by all workers: sqlite:///path on one host, or redis://host:port for several hosts
+        self.rate_limit_storage_uri = os.environ.get("RATE_LIMIT_STORAGE_URI", "sqlite:///cache/ratelimit.sqlite3")
     
 
     def _build_llm_config(self) -> dict:
@@ -47,12 +129,32 @@ class Config:
             # Google Gemini config
             "google_api_key": os.environ.get("GOOGLE_API_KEY", ""),
             "gemini_model": os.environ.get("GEMINI_MODEL", "gemini-2.0-flash"),
+
+            # Hedging and failover, only used with LLM_FALLBACK_PROVIDERS
+            "hedge_percentile": float(os.environ.get("LLM_HEDGE_PERCENTILE", 95)),
+            "hedge_default_delay": float(os.environ.get("LLM_HEDGE_DEFAULT_DELAY", 5)), # seconds, until enough latencies are recorded
+            "circuit_failure_threshold": int(os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", 3)),
+            "circuit_reset_timeout": float(os.environ.get("LLM_CIRCUIT_RESET_TIMEOUT", 30)), # seconds
         }
 
     def get_llm(self, temperature: float = 0.7, **kwargs):
         """Get language model instance"""
         return self.llm_provider.get_client(temperature=temperature, **kwargs)
     
+    @property
+    def llm_provider(self) -> BaseLLMProvider:
+        if self._llm_provider is None and self.llm_fallback_providers:
+            self._llm_provider = LLMProviderFactory.create_hedged_provider(
+                [self.llm_provider_name, *self.llm_fallback_providers],
+                self.llm_config
+            )
+        elif self._llm_provider is None:
+            self._llm_provider = LLMProviderFactory.create_provider(
+                self.llm_provider_name, 
+                self.llm_config
+            )
+        return self._llm_provider
+
     def get_llm_provider(self) -> BaseLLMProvider:
         """Get the LLM provider instance"""
         return self.llm_provider
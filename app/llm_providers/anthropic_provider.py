@@ -10,8 +10,8 @@ class AnthropicProvider(BaseLLMProvider):
         self.api_key = config.get("anthropic_api_key", "")
         self.model = config.get("anthropic_model", "claude-3-sonnet-20240229")
     
-    def get_client(self, temperature: float = 0.7, **kwargs) -> ChatAnthropic:
-        """Return Anthropic client"""
+    def create_client(self, temperature: float = 0.7, **kwargs) -> ChatAnthropic:
+        """Create Anthropic client"""
         return ChatAnthropic(
             model=self.model,
             api_key=self.api_key,
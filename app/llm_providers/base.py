@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -10,10 +12,26 @@ class BaseLLMProvider(ABC):
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logger
+        # clients hold their own HTTP connection pools, reuse them across requests
+        self._clients: Dict[Tuple[str, float, str], Any] = {}
+        self._clients_lock = threading.Lock()
     
-    @abstractmethod
     def get_client(self, temperature: float = 0.7, **kwargs) -> Any:
-        """Return the LLM client instance"""
+        """Return a cached LLM client instance for the model, temperature and options"""
+        key = (self.get_model_name(), temperature, json.dumps(kwargs, sort_keys=True, default=repr))
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self.create_client(temperature=temperature, **kwargs)
+                self._clients[key] = client
+        return client
+
+    def get_client_stats(self) -> Dict[str, Any]:
+        return {"cached_clients": len(self._clients)}
+
+    @abstractmethod
+    def create_client(self, temperature: float = 0.7, **kwargs) -> Any:
+        """Create a new LLM client instance"""
         pass
     
     @abstractmethod
@@ -21,6 +39,10 @@ class BaseLLMProvider(ABC):
         """Return the name of the LLM provider"""
         pass
     
+    def get_model_name(self) -> str:
+        """Return the name of the model used by the provider"""
+        return getattr(self, "model", "")
+    
     def validate_config(self) -> bool:
         """Validate provider-specific configuration"""
         return True
@@ -1,9 +1,6 @@
-from typing import Dict, Any
+from importlib import import_module
+from typing import Dict, Any, List, Type
 
-from app.llm_providers.anthropic_provider import AnthropicProvider
-from app.llm_providers.gemini_provider import GeminiProvider
-from app.llm_providers.ollama_provider import OllamaProvider
-from app.llm_providers.openai_provider import OpenAIProvider
 from .base import BaseLLMProvider
 import logging
 
@@ -12,11 +9,12 @@ logger = logging.getLogger(__name__)
 class LLMProviderFactory:
     """Factory for creating LLM providers"""
     
+    # provider classes are imported on demand, each one pulls in its own LangChain package
     _providers = {
-        "ollama": OllamaProvider,
-        "openai": OpenAIProvider,
-        "anthropic": AnthropicProvider,
-        "gemini": GeminiProvider,
+        "ollama": "app.llm_providers.ollama_provider:OllamaProvider",
+        "openai": "app.llm_providers.openai_provider:OpenAIProvider",
+        "anthropic": "app.llm_providers.anthropic_provider:AnthropicProvider",
+        "gemini": "app.llm_providers.gemini_provider:GeminiProvider",
     }
     
     @classmethod
@@ -26,7 +24,7 @@ class LLMProviderFactory:
             available = ", ".join(cls._providers.keys())
             raise ValueError(f"Unknown LLM provider: {provider_name}. Available: {available}")
         
-        provider_class = cls._providers[provider_name]
+        provider_class = cls._load_provider_class(provider_name)
         provider = provider_class(config)
         
         if not provider.validate_config():
@@ -35,6 +33,34 @@ class LLMProviderFactory:
         logger.info(f"Created {provider_name} LLM provider")
         return provider
     
+    @classmethod
+    def create_hedged_provider(cls, provider_names: List[str], config: Dict[str, Any]) -> BaseLLMProvider:
+        """Create a composite provider that hedges and fails over across the given providers, in order"""
+        from .hedged_provider import HedgedLLMProvider
+
+        providers = []
+        for provider_name in provider_names:
+            try:
+                providers.append(cls.create_provider(provider_name, config))
+            except (ValueError, ImportError) as e:
+                # a misconfigured fallback should not take the primary down with it
+                logger.warning(f"Skipping {provider_name} backend: {str(e)}")
+
+        provider = HedgedLLMProvider(config, providers)
+        if not provider.validate_config():
+            raise ValueError(f"No valid backend among {', '.join(provider_names)}")
+
+        logger.info(f"Created hedged LLM provider over {', '.join(p.get_provider_name() for p in providers)}")
+        return provider
+
+    @classmethod
+    def _load_provider_class(cls, provider_name: str) -> Type[BaseLLMProvider]:
+        provider_class = cls._providers[provider_name]
+        if isinstance(provider_class, str):
+            module_name, class_name = provider_class.split(":")
+            provider_class = getattr(import_module(module_name), class_name)
+        return provider_class
+
     @classmethod
     def get_available_providers(cls) -> list:
         """Get list of available providers"""
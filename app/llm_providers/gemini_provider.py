@@ -9,8 +9,8 @@ class GeminiProvider(BaseLLMProvider):
         self.api_key = config.get("google_api_key", "")
         self.model = config.get("gemini_model", "gemini-1.5-pro")
     
-    def get_client(self, temperature: float = 0.7, **kwargs) -> ChatGoogleGenerativeAI:
-        """Return Gemini client"""
+    def create_client(self, temperature: float = 0.7, **kwargs) -> ChatGoogleGenerativeAI:
+        """Create Gemini client"""
         return ChatGoogleGenerativeAI(
             model=self.model,
             google_api_key=self.api_key,
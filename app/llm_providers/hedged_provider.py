@@ -0,0 +1,270 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.llm_providers.base import BaseLLMProvider
+
+
+class CircuitBreaker:
+    """Stops sending traffic to a backend after repeated failures, probes it with a single call after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        # the sync path runs in worker threads
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call would be admitted right now, without claiming it"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.probe_in_flight)
+
+    def acquire(self) -> Tuple[bool, bool]:
+        """Admit a call: always when closed, never when open, and only the one probe while half open.
+
+        Returns whether the call is admitted and whether it is the probe, only the probe may release it.
+        """
+        with self._lock:
+            state = self.state
+            if state == "half_open":
+                if self.probe_in_flight:
+                    return False, False
+                self.probe_in_flight = True
+                return True, True
+            return state == "closed", False
+
+    def release(self):
+        """The probe was cancelled before it said anything about the backend's health"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_success(self):
+        # closing the circuit admits everything, a probe still in flight no longer matters
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self, probe: bool = False):
+        with self._lock:
+            # a failed call in half-open state re-opens the circuit right away
+            half_open = self.state == "half_open"
+            self.failures += 1
+            if self.failures >= self.failure_threshold or half_open:
+                self.opened_at = time.monotonic()
+            if probe:
+                self.probe_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of call latencies, calls cancelled by a faster hedge count with the time they had taken so far"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+
+class Backend:
+    """One provider behind the hedged provider, with its health bookkeeping"""
+
+    def __init__(self, provider: BaseLLMProvider, breaker: CircuitBreaker, latency: LatencyTracker):
+        self.provider = provider
+        self.name = provider.get_provider_name()
+        self.breaker = breaker
+        self.latency = latency
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "p50_seconds": self.latency.percentile(50),
+            "p95_seconds": self.latency.percentile(95),
+        }
+
+
+class HedgedChatModel(Runnable):
+    """Chat model that races a secondary backend when the primary is slow and fails over on errors"""
+
+    def __init__(self, backends: List[Backend], clients: List[Any], hedge_percentile: float, default_hedge_delay: float):
+        self.backends = backends
+        self.clients = clients
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+
+    def _candidates(self) -> Tuple[List[int], bool]:
+        """Backends to try in order, and whether they are forced because no circuit admits calls"""
+        healthy = [index for index, backend in enumerate(self.backends) if backend.breaker.allow()]
+        # with every circuit open, trying anyway beats failing without a single attempt
+        if healthy:
+            return healthy, False
+        return list(range(len(self.backends))), True
+
+    def _hedge_delay(self, index: int) -> float:
+        delay = self.backends[index].latency.percentile(self.hedge_percentile)
+        return delay if delay is not None else self.default_hedge_delay
+
+    @staticmethod
+    def _validate(result: Any) -> Any:
+        if result is None or getattr(result, "content", "x") in ("", None):
+            raise ValueError("LLM returned an empty response")
+        return result
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        """Synchronous path, plain failover in order without hedging"""
+        errors = []
+        candidates, forced = self._candidates()
+        for index in candidates:
+            backend = self.backends[index]
+            admitted, probe = backend.breaker.acquire()
+            if not admitted and not forced:
+                continue
+            start = time.monotonic()
+            try:
+                result = self._validate(self.clients[index].invoke(input, config, **kwargs))
+            except Exception as e:
+                backend.breaker.record_failure(probe)
+                errors.append(f"{backend.name}: {e}")
+                continue
+            backend.latency.record(time.monotonic() - start)
+            backend.breaker.record_success()
+            return result
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        candidates, forced = self._candidates()
+        pending: Dict[asyncio.Task, int] = {}
+        started: Dict[asyncio.Task, float] = {}
+        # calls holding their backend's half-open probe
+        probes: Set[asyncio.Task] = set()
+        errors = []
+
+        async def call(index: int):
+            start = time.monotonic()
+            result = self._validate(await self.clients[index].ainvoke(input, config, **kwargs))
+            return result, time.monotonic() - start
+
+        def launch_next() -> Optional[int]:
+            while candidates:
+                index = candidates.pop(0)
+                # half-open backends take one probe at a time, a concurrent call may have claimed it since
+                admitted, probe = self.backends[index].breaker.acquire()
+                if not admitted and not forced:
+                    continue
+                task = asyncio.create_task(call(index))
+                pending[task] = index
+                started[task] = time.monotonic()
+                if probe:
+                    probes.add(task)
+                return index
+            return None
+
+        primary = launch_next()
+        if primary is None:
+            raise RuntimeError("No LLM provider is accepting calls")
+        hedge_delay = self._hedge_delay(primary)
+        try:
+            while pending:
+                # only wait for the hedge delay while there is still a backend left to race
+                timeout = hedge_delay if candidates else None
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch_next()
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    backend = self.backends[index]
+                    try:
+                        result, seconds = task.result()
+                    except Exception as e:
+                        backend.breaker.record_failure(task in probes)
+                        errors.append(f"{backend.name}: {e}")
+                        continue
+                    backend.latency.record(seconds)
+                    backend.breaker.record_success()
+                    return result
+                # everything that finished failed, fail over right away
+                if not pending and candidates:
+                    launch_next()
+        finally:
+            # cancel the losers, they took at least this long, leaving them out would bias the hedge delay low
+            now = time.monotonic()
+            for task, index in pending.items():
+                task.cancel()
+                backend = self.backends[index]
+                backend.latency.record(now - started[task])
+                # a cancelled call admitted while the circuit was closed must not free another call's probe
+                if task in probes:
+                    backend.breaker.release()
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+
+class HedgedLLMProvider(BaseLLMProvider):
+    """Composite provider over an ordered list of providers with hedging, failover and circuit breakers"""
+
+    def __init__(self, config: Dict[str, Any], providers: List[BaseLLMProvider]):
+        super().__init__(config)
+        self.hedge_percentile = float(config.get("hedge_percentile", 95))
+        self.default_hedge_delay = float(config.get("hedge_default_delay", 5))
+        self.backends = [
+            Backend(
+                provider,
+                CircuitBreaker(
+                    int(config.get("circuit_failure_threshold", 3)),
+                    float(config.get("circuit_reset_timeout", 30)),
+                ),
+                LatencyTracker(),
+            )
+            for provider in providers
+        ]
+
+    def create_client(self, temperature: float = 0.7, **kwargs) -> HedgedChatModel:
+        """Return a hedged client over every backend's client"""
+        return HedgedChatModel(
+            self.backends,
+            [backend.provider.get_client(temperature=temperature, **kwargs) for backend in self.backends],
+            self.hedge_percentile,
+            self.default_hedge_delay,
+        )
+
+    def get_provider_name(self) -> str:
+        return "hedged"
+
+    def get_model_name(self) -> str:
+        return ",".join(f"{backend.name}:{backend.provider.get_model_name()}" for backend in self.backends)
+
+    def get_client_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_client_stats(),
+            "backends": {backend.name: backend.stats() for backend in self.backends},
+        }
+
+    def validate_config(self) -> bool:
+        if not self.backends:
+            self.logger.error("Hedged provider needs at least one valid backend")
+            return False
+        return True
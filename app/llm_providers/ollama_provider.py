@@ -11,8 +11,8 @@ class OllamaProvider(BaseLLMProvider):
         self.base_url = config.get("ollama_base_url", "http://host.docker.internal:11434")
         self.model = config.get("ollama_model", "llama3.2")
     
-    def get_client(self, temperature: float = 0.7, **kwargs) -> ChatOllama:
-        """Return Ollama client"""
+    def create_client(self, temperature: float = 0.7, **kwargs) -> ChatOllama:
+        """Create Ollama client"""
         return ChatOllama(
             model=self.model,
             base_url=self.base_url,
@@ -10,8 +10,8 @@ class OpenAIProvider(BaseLLMProvider):
         self.api_key = config.get("openai_api_key", "")
         self.model = config.get("openai_model", "gpt-4")
     
-    def get_client(self, temperature: float = 0.7, **kwargs) -> ChatOpenAI:
-        """Return OpenAI client"""
+    def create_client(self, temperature: float = 0.7, **kwargs) -> ChatOpenAI:
+        """Create OpenAI client"""
         return ChatOpenAI(
             model=self.model,
             api_key=self.api_key,
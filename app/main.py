@@ -1,21 +1,57 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 from slowapi.middleware import SlowAPIMiddleware
 
+import asyncio
+import json
 import logging
+from typing import Literal, Optional
 from app.config import Config
 from app.agents.business_analyzer import BusinessAnalyzer
 from app.agents.meme_generator import MemeImageGenerator
 from app.agents.meme_template_generator import MemeCampaignGenerator
+from app.middlewares.server_timing import ServerTimingMiddleware
 from app.middlewares.timeout import TimeoutMiddleware
+from app.bulk_pipeline import BulkCampaignPipeline
+from app.models.bulk_campaign import BulkCampaignRequest
+from app.pipeline import CampaignPipeline
+from app.services.job_runner import JobRunner
+from app.services.http_pool import HttpClientPool
+from app.services.image_store import ImageStore
+from app.services.job_store import get_job_store
+from app.services.metrics import RATE_LIMITED
+# registers the sqlite:// rate limit storage with limits
+from app.services import rate_limit_storage  # noqa: F401
+from app.services.rate_limit_storage import WeightedQuota
+from app.services.template_catalog import TemplateCatalog
+from app.services.warmup import WarmupTracker
+from app.utils import embedding_stats
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # warm up in the background so the worker accepts requests right away, /ready reports progress
+    warmup_task = asyncio.create_task(warmup.run())
+    job_runner.start()
+    image_store.start()
+    template_catalog.start()
+    yield
+    warmup_task.cancel()
+    await job_runner.stop()
+    await image_store.stop()
+    await template_catalog.stop()
+    await HttpClientPool(config).aclose()
+
+app = FastAPI(lifespan=lifespan)
 config = Config()
 
 app.add_middleware(TimeoutMiddleware, timeout=60)
+app.add_middleware(ServerTimingMiddleware)
 
 def real_ip(request: Request):
     xff = request.headers.get("X-Forwarded-For")
@@ -23,11 +59,32 @@ def real_ip(request: Request):
         return xff.split(",")[0].strip()
     return request.client.host
 
-limiter = Limiter(key_func=real_ip)
+limiter = Limiter(key_func=real_ip, storage_uri=config.rate_limit_storage_uri)
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+    RATE_LIMITED.labels(path=request.url.path).inc()
+    return _rate_limit_exceeded_handler(request, exc)
+
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded)
 rate_limit_key = f"{config.rate_limit_max_requests}/{config.rate_window}"
+# campaign requests cost as much quota as the memes they generate, charged by the endpoints once parsed;
+# each quota has its own key, so it never shares a counter with the request limit
+meme_quota = WeightedQuota(
+    f"{config.rate_limit_max_memes}/{config.rate_window}", config.rate_limit_storage_uri, "memes"
+)
+bulk_meme_quota = WeightedQuota(
+    f"{config.rate_limit_bulk_memes}/{config.rate_window}", config.rate_limit_storage_uri, "bulk-memes"
+)
+
+async def charge_memes(request: Request, quota: WeightedQuota, num_memes: int):
+    """Charge a request's memes to the client's quota, a rejected request costs nothing"""
+    if not await asyncio.to_thread(quota.charge, real_ip(request), max(1, num_memes)):
+        RATE_LIMITED.labels(path=request.url.path).inc()
+        raise HTTPException(status_code=429, detail=f"Meme quota of {quota.limit} exceeded")
+
+ImageFormat = Literal["png", "webp", "jpg"]
 
 origins = [
     "http://localhost",
@@ -46,22 +103,184 @@ app.add_middleware(
 business_analyzer = BusinessAnalyzer(config)
 meme_campaign_generator = MemeCampaignGenerator(config)
 meme_generator = MemeImageGenerator(config)
+campaign_pipeline = CampaignPipeline(business_analyzer, meme_campaign_generator, meme_generator)
+bulk_pipeline = BulkCampaignPipeline(config, business_analyzer, meme_campaign_generator, meme_generator)
+job_runner = JobRunner(
+    campaign_pipeline,
+    get_job_store(config.job_store_backend, config.job_store_path),
+    workers=config.job_workers,
+    queue_size=config.job_queue_size,
+)
+image_store = ImageStore(config)
+template_catalog = TemplateCatalog(config)
 logger = logging.getLogger(__name__)
 
+warmup = WarmupTracker()
+warmup.register("llm", lambda: (business_analyzer.llm, meme_campaign_generator.llm))
+warmup.register("meme_generator", meme_generator.generator.warmup)
+
 @app.get("/health")
-def read_root():
+async def read_root():
     return {"message": "Sab Changa si!"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe, only reports ready once models and clients are warmed up"""
+    return JSONResponse(
+        status_code=200 if warmup.ready else 503,
+        content={"ready": warmup.ready, "components": warmup.status},
+    )
+
+def llm_client_stats():
+    try:
+        return config.get_llm_provider().get_client_stats()
+    except ValueError as e:
+        return {"error": str(e)}
+
+@app.get("/stats")
+async def stats():
+    """Cache and connection pool counters for tuning"""
+    return {
+        "website_cache": business_analyzer.website_loader.cache.stats(),
+        "profile_cache": {
+            **business_analyzer.profile_cache.stats(),
+            "shared_in_flight": business_analyzer.profile_flight.shared,
+        },
+        "concept_pool": meme_campaign_generator.concept_pool.stats(),
+        "template_catalog": template_catalog.stats(),
+        "coalesced": {
+            "page_fetch": business_analyzer.website_loader.fetches.shared,
+            "profile": business_analyzer.url_flight.shared,
+            "concepts": meme_campaign_generator.generations.shared,
+        },
+        "meme_generator": meme_generator.generator.stats(),
+        "image_store": image_store.stats(),
+        "embeddings": await asyncio.to_thread(embedding_stats),
+        "http_pools": HttpClientPool(config).stats(),
+        "llm_clients": llm_client_stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage timings, retries, cache lookups and rate limit rejections"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/images/{object_name}")
+async def get_image(object_name: str):
+    """Stable image URL, served from the local spool until the background upload finished, then from MinIO"""
+    try:
+        spooled = image_store.spooled(object_name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if spooled:
+        path, content_type = spooled
+        # object names are content addressed, the bytes behind a name never change
+        return FileResponse(path, media_type=content_type, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+    source = image_store.pending_variant_source(object_name)
+    if source:
+        return RedirectResponse(image_store.url(source), status_code=307)
+    remote_url = await image_store.remote_url(object_name)
+    if remote_url is None:
+        # variants encoded by another worker, stored before IMAGE_VARIANTS listed them or whose encode failed
+        original = image_store.variant_original(object_name)
+        if original is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        return RedirectResponse(image_store.url(original), status_code=307)
+    return RedirectResponse(remote_url, status_code=307)
+
 @app.post("/meme_campaign")
 @limiter.limit(rate_limit_key)
-def meme_campaign(request: Request, url: str, num_memes: int = 1):
+async def meme_campaign(
+    request: Request,
+    url: str,
+    num_memes: int = 1,
+    concurrency: Optional[int] = None,
+    format: Optional[ImageFormat] = None,
+):
     """Generate a meme campaign based on a website"""
-    business_profile = business_analyzer.do(url)
+    await charge_memes(request, meme_quota, num_memes)
+    business_profile = await business_analyzer.do(url)
     logger.info(f"Business profile: {business_profile}")   
-    meme_content = meme_campaign_generator.do(business_profile, num_memes)
+    meme_content = await meme_campaign_generator.do(business_profile, num_memes)
     logger.info(f"Generated meme content: {meme_content}")
-    meme_images = []
-    for meme in meme_content:
-        image_path = meme_generator.do(business_profile.name, meme)
-        meme_images.append(image_path)
-    return {"meme_images": meme_images}
\ No newline at end of file
+    results = await meme_generator.do_many(business_profile.name, meme_content, concurrency, format)
+    return {
+        "meme_images": [result.url for result in results],
+        "variants": [result.variants for result in results],
+        "errors": [result.error for result in results],
+    }
+
+@app.post("/meme_campaign/stream")
+@limiter.limit(rate_limit_key)
+async def meme_campaign_stream(
+    request: Request,
+    url: str,
+    num_memes: int = 1,
+    concurrency: Optional[int] = None,
+    format: Optional[ImageFormat] = None,
+):
+    """Stream a meme campaign as NDJSON, or as Server-Sent Events when the client accepts text/event-stream"""
+    await charge_memes(request, meme_quota, num_memes)
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        async for event in campaign_pipeline.events(url, num_memes, concurrency, format):
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+
+    # the response starts right away, so TimeoutMiddleware only bounds the time to the first byte
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/meme_campaign/bulk")
+@limiter.limit(rate_limit_key)
+async def meme_campaign_bulk(request: Request, bulk: BulkCampaignRequest):
+    """Generate campaigns for many websites, returned as a downloadable NDJSON manifest with one line per website"""
+    if len(bulk.campaigns) > config.bulk_max_campaigns:
+        raise HTTPException(status_code=413, detail=f"At most {config.bulk_max_campaigns} campaigns per request")
+    await charge_memes(request, bulk_meme_quota, sum(item.num_memes for item in bulk.campaigns))
+
+    async def body():
+        async for entry in bulk_pipeline.manifest(bulk.campaigns, bulk.concurrency, bulk.format):
+            yield json.dumps(entry) + "\n"
+
+    # entries are streamed as campaigns finish, so TimeoutMiddleware only bounds the time to the first byte
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": 'attachment; filename="meme-campaigns.ndjson"',
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+@app.post("/meme_campaign/jobs", status_code=202)
+@limiter.limit(rate_limit_key)
+async def meme_campaign_job(
+    request: Request,
+    url: str,
+    num_memes: int = 1,
+    concurrency: Optional[int] = None,
+    format: Optional[ImageFormat] = None,
+):
+    """Queue a meme campaign and return its job id right away"""
+    await charge_memes(request, meme_quota, num_memes)
+    try:
+        job = await job_runner.submit(url, num_memes, concurrency, format)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many queued campaigns. Try again later.")
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Per-stage progress and partial results of a queued campaign"""
+    job = await asyncio.to_thread(job_runner.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
\ No newline at end of file
@@ -1,10 +1,24 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Dict, List, Optional
 from app.models.meme_content import MemeContent
 
 
 class MemeGeneratorInterface(ABC):
     @abstractmethod
-    def generate(self, business_name: str, meme_content: MemeContent, filename: str) -> Optional[str]:
-        """Generate a meme image from the provided meme content."""
+    async def generate(
+        self, business_name: str, meme_content: MemeContent, filename: str, image_format: str = "png"
+    ) -> Optional[str]:
+        """Generate a meme image from the provided meme content, as png, webp or jpg."""
+        pass
+
+    def warmup(self) -> None:
+        """Optional hook to load models and check storage before serving traffic."""
+        pass
+
+    def stats(self) -> Dict:
+        """Optional counters reported on /stats."""
+        return {}
+
+    async def prepare(self, meme_contents: List[MemeContent]) -> None:
+        """Optional hook to do batched work for a whole campaign before the memes are generated."""
         pass
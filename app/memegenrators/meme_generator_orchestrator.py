@@ -1,13 +1,16 @@
 
-from app.memegenrators.memegen_meme_generator import MemeGenLinkMemeGenerator
-from app.memegenrators.openai_meme_generator import OpenAIMemeGenerator
-
 
 def get_meme_generator(config):
     """Return the appropriate meme generator based on the configuration"""
+    # only import the selected generator, their dependencies are heavy
     if config.meme_generator == "openai":
+        from app.memegenrators.openai_meme_generator import OpenAIMemeGenerator
         return OpenAIMemeGenerator(config)
     elif config.meme_generator == "memegen":
+        from app.memegenrators.memegen_meme_generator import MemeGenLinkMemeGenerator
         return MemeGenLinkMemeGenerator(config)
+    elif config.meme_generator == "pillow":
+        from app.memegenrators.pillow_meme_generator import PillowMemeGenerator
+        return PillowMemeGenerator(config)
     else:
         raise ValueError(f"Invalid meme generator: {config.meme_generator}")
\ No newline at end of file
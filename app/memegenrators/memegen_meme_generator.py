@@ -1,73 +1,154 @@
+import asyncio
+import hashlib
+import json
 import os
-from io import BytesIO
 from pathlib import Path
-from typing import Optional, Dict
-import requests
+from typing import Optional, Dict, List
 import logging
 
 import urllib
 from app.config import Config
 from app.memegenrators.meme_generator_interface import MemeGeneratorInterface
 from app.models.meme_content import MemeContent
+from app.services.http_pool import HttpClientPool
+from app.services.image_store import ImageStore
+from app.services.metrics import record_cache, timed
 from app.services.minio import MinioClient
-from app.services.pinecone import PineconeClient
-from app.utils import create_embeddings
+from app.services.template_catalog import TemplateCatalog
+from app.services.template_index import get_template_index
+from app.utils import create_embeddings, create_embeddings_batch, get_encoding_model
 
 logger = logging.getLogger(__name__)
 
 class MemeGenLinkMemeGenerator(MemeGeneratorInterface):
     """Generates images using the memegen.link API"""
+    render_backend = "memegen"
 
     def __init__(self, config: Config):
         self.config = config
         self.save_dir = Path(getattr(config, "save_directory", "memes"))
         self.save_dir.mkdir(parents=True, exist_ok=True)
         self.minio_client = MinioClient(config)
-        self.pinecone_client = PineconeClient(config)
+        self.image_store = ImageStore(config)
+        self.template_index = get_template_index(config)
+        self.catalog = TemplateCatalog(config)
+        self.http_client = HttpClientPool(config).get("memegen", timeout=30)
+        self.render_cache = {"hits": 0, "misses": 0}
 
-    def generate(self, business_name: str, meme_content: MemeContent, filename: str) -> Optional[str]:
+    def warmup(self) -> None:
+        self.minio_client.ensure_bucket()
+        if not self.catalog.loaded:
+            self.catalog.load()
+        get_encoding_model()
+        if hasattr(self.template_index, "load"):
+            # builds a missing or stale index, /ready reports not ready until it is done
+            self.template_index.load(build=True)
+
+    async def prepare(self, meme_contents: List[MemeContent]) -> None:
+        await self.catalog.ensure_loaded()
+        # templates known by name never need an embedding
+        unmatched = [meme.model_dump() for meme in meme_contents if not self.catalog.match(meme.template_name, record=False)]
+        if not unmatched:
+            return
+        # one encode() call for the whole campaign, generate() then hits the embedding cache
+        with timed("embedding"):
+            await asyncio.to_thread(create_embeddings_batch, unmatched)
+
+    def stats(self) -> Dict:
+        return {"render_cache": dict(self.render_cache)}
+
+    def object_name(self, template_id: str, texts: List[str], image_format: str) -> str:
+        """Content-addressed object name, identical renders map to the same object"""
+        parts = [self.render_backend, template_id, [text.strip() for text in texts], image_format]
+        if image_format != "png":
+            parts.append(self.config.image_quality)
+        key = json.dumps(parts)
+        return f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.{image_format}"
+
+    async def generate(
+        self, business_name: str, meme_content: MemeContent, filename: str, image_format: str = "png"
+    ) -> Optional[str]:
+        """Render the meme, the object name is derived from its content so `filename` is not used"""
         try:
-            related_template = self.find_related_template(meme_content)
+            related_template = await self.find_related_template(meme_content)
             if not related_template:
                 logger.warning("No related template found.")
                 return None
             template_id = related_template.get("id", "")
-            formatted_texts = [
-                urllib.parse.quote(text.strip().replace("-", "--").replace("_", "__").replace("/", "~s"))
-                for text in meme_content.texts
-            ]
-            text_path = "/".join(formatted_texts) if formatted_texts else "_"
-            url = f"https://api.memegen.link/images/{template_id}/{text_path}.png"
-            logger.info(f"Fetching meme URL: {url}")
-            image_response = requests.get(url=url)
-            image_bytes = image_response.content
-            image_stream = BytesIO(image_bytes)
-            object_name = Path(filename).name
-            presigned_url = self.minio_client.put_file(image_stream, object_name)
-            logger.info(f"Meme saved to {presigned_url}")
-            return presigned_url
+            texts = self.catalog.fit_texts(template_id, meme_content.texts)
+            if texts is None:
+                logger.warning(f"Meme concept for {business_name} has no text to render")
+                return None
+            object_name = self.object_name(template_id, texts, image_format)
+            exists = await self.image_store.exists(object_name)
+            record_cache("render", exists)
+            if exists:
+                self.render_cache["hits"] += 1
+                logger.info(f"Reusing previously rendered meme {object_name}")
+                return self.image_store.url(object_name)
+            self.render_cache["misses"] += 1
+
+            with timed("image_render"):
+                image_bytes = await self.render(template_id, texts, image_format)
+            image_url = await self.image_store.put_image(image_bytes, object_name, image_format)
+            logger.info(f"Meme saved to {image_url}")
+            return image_url
         except Exception as e:
-            logger.error(f"Error generating image with Memegen API: {str(e)}")
+            logger.error(f"Error generating image with {self.render_backend}: {str(e)}")
             return None
 
-    def find_related_template(self, meme_content: MemeContent) -> Optional[Dict]:
-        vector_embedding = create_embeddings(content=meme_content.model_dump())
+    async def render(self, template_id: str, texts: List[str], image_format: str = "png") -> bytes:
+        """Return the image bytes of the template with the texts applied, memegen.link encodes every format we use"""
+        formatted_texts = [
+            urllib.parse.quote(text.strip().replace("-", "--").replace("_", "__").replace("/", "~s"))
+            for text in texts
+        ]
+        text_path = "/".join(formatted_texts) if formatted_texts else "_"
+        url = f"{self.config.memegen_base_url}/images/{template_id}/{text_path}.{image_format}"
+        logger.info(f"Fetching meme URL: {url}")
+        image_response = await self.http_client.get(url)
+        image_response.raise_for_status()
+        return image_response.content
+
+    async def find_related_template(self, meme_content: MemeContent) -> Optional[Dict]:
+        await self.catalog.ensure_loaded()
+        with timed("template_lookup"):
+            matched = self.catalog.match(meme_content.template_name)
+        record_cache("template_catalog", matched is not None)
+        if matched:
+            template, how = matched
+            logger.info(f"Matched template name {meme_content.template_name!r} to {template['id']} ({how})")
+            return {"id": template["id"], "name": template.get("name", "")}
+
+        # encoding is CPU bound, keep it off the event loop
+        with timed("embedding"):
+            vector_embedding = await asyncio.to_thread(create_embeddings, content=meme_content.model_dump())
         if not vector_embedding:
             logger.warning("Vector embedding is empty.")
             return None
         try:
-            query_response = self.pinecone_client.query(
-                query_vector=vector_embedding,
-            )
+            with timed("template_lookup"):
+                query_response = await self.template_index.aquery(
+                    query_vector=vector_embedding,
+                    top_k=self.config.template_match_candidates,
+                )
         except Exception as e:
-            logger.exception(f"Failed to query Pinecone: {e}")
+            logger.exception(f"Failed to query template index: {e}")
             return None
 
         matches = query_response.get("matches", [])
         if matches:
+            # a candidate with a slot for every text beats the closest one only when it is nearly as close,
+            # fit_texts copes with a slot count mismatch
+            floor = matches[0]["score"] - self.config.template_lines_margin
+            best = next(
+                (match for match in matches
+                 if match["score"] >= floor and self.catalog.lines(match["id"]) == len(meme_content.texts)),
+                matches[0],
+            )
             return {
-                "id": matches[0]["id"],
-                "name": matches[0]["metadata"].get("name", "")
+                "id": best["id"],
+                "name": best["metadata"].get("name", "")
             }
 
         logger.info("No match found.")
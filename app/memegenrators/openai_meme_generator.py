@@ -1,13 +1,16 @@
-from io import BytesIO
+import asyncio
 from pathlib import Path
 from typing import Optional
 import base64
-import requests
 import logging
 
 from app.config import Config
 from app.memegenrators.meme_generator_interface import MemeGeneratorInterface
 from app.models.meme_content import MemeContent
+from app.services import image_codec
+from app.services.http_pool import HttpClientPool
+from app.services.image_store import ImageStore
+from app.services.metrics import timed
 from app.services.minio import MinioClient
 
 logger = logging.getLogger(__name__)
@@ -20,8 +23,16 @@ class OpenAIMemeGenerator(MemeGeneratorInterface):
         self.save_dir = Path(getattr(config, "save_directory", "memes"))
         self.save_dir.mkdir(parents=True, exist_ok=True)
         self.minio_client = MinioClient(config)
+        self.image_store = ImageStore(config)
+        # DALL·E 3 generations regularly take longer than a few seconds
+        self.http_client = HttpClientPool(config).get("openai", timeout=120)
 
-    def generate(self, business_name: str, meme_content: MemeContent, filename: str) -> Optional[str]:
+    def warmup(self) -> None:
+        self.minio_client.ensure_bucket()
+
+    async def generate(
+        self, business_name: str, meme_content: MemeContent, filename: str, image_format: str = "png"
+    ) -> Optional[str]:
         try:
             texts_prompt = "\n".join([f"- Text {i+1}: {text}" for i, text in enumerate(meme_content.texts)])
 
@@ -38,7 +49,7 @@ class OpenAIMemeGenerator(MemeGeneratorInterface):
             
             headers = {
                 "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.config.openai_api_key}"
+                "Authorization": f"Bearer {self.config.llm_config['openai_api_key']}"
             }
             payload = {
                 "model": "dall-e-3",
@@ -48,18 +59,22 @@ class OpenAIMemeGenerator(MemeGeneratorInterface):
                 "response_format": "b64_json"
             }
             
-            response = requests.post("https://api.openai.com/v1/images/generations", headers=headers, json=payload)
-            response.raise_for_status()
+            with timed("image_render"):
+                response = await self.http_client.post(
+                    "https://api.openai.com/v1/images/generations", headers=headers, json=payload
+                )
+                response.raise_for_status()
             image_response = response.json()
             
             image_data = image_response['data'][0]['b64_json']
             image_binary = base64.b64decode(image_data)
-            image_stream = BytesIO(image_binary)
-            object_name = Path(filename).name
-            return self.minio_client.client.put_object(
-                image_stream,
-                object_name,
-            )
+            # DALL·E only returns PNG, other formats are re-encoded here
+            if image_format != "png":
+                image_binary = await asyncio.to_thread(
+                    image_codec.reencode, image_binary, image_format, self.config.image_quality
+                )
+            object_name = Path(filename).with_suffix(f".{image_format}").name
+            return await self.image_store.put_image(image_binary, object_name, image_format)
 
         except Exception as e:
             logger.error(f"Error generating image: {str(e)}")
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import textwrap
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.config import Config
+from app.memegenrators.memegen_meme_generator import MemeGenLinkMemeGenerator
+from app.services import image_codec
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# text boxes as (left, top, width, height) fractions of the image
+Box = Tuple[float, float, float, float]
+
+TEMPLATE_LAYOUTS: Dict[str, List[Box]] = {
+    "drake": [(0.5, 0.0, 0.5, 0.5), (0.5, 0.5, 0.5, 0.5)],
+    "gb": [(0.0, 0.0, 0.5, 0.25), (0.0, 0.25, 0.5, 0.25), (0.0, 0.5, 0.5, 0.25), (0.0, 0.75, 0.5, 0.25)],
+    "db": [(0.05, 0.6, 0.3, 0.3), (0.38, 0.45, 0.3, 0.3), (0.68, 0.55, 0.3, 0.3)],
+    "cmm": [(0.3, 0.62, 0.45, 0.25)],
+}
+
+FONT_CANDIDATES = [
+    "Impact.ttf",
+    "impact.ttf",
+    "/usr/share/fonts/truetype/msttcorefonts/Impact.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "DejaVuSans-Bold.ttf",
+]
+MIN_FONT_SIZE = 12
+
+
+def default_layout(lines: int) -> List[Box]:
+    """Top/bottom captions, or evenly stacked bands for templates with more lines"""
+    if lines <= 1:
+        return [(0.0, 0.75, 1.0, 0.25)]
+    if lines == 2:
+        return [(0.0, 0.0, 1.0, 0.25), (0.0, 0.75, 1.0, 0.25)]
+    return [(0.0, i / lines, 1.0, 1 / lines) for i in range(lines)]
+
+
+@lru_cache(maxsize=None)
+def load_font(font_path: Optional[str], size: int) -> ImageFont.ImageFont:
+    for candidate in [font_path, *FONT_CANDIDATES]:
+        if not candidate:
+            continue
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    logger.warning("No impact-style font found, falling back to the Pillow default font")
+    return ImageFont.load_default(size)
+
+
+class PillowMemeGenerator(MemeGenLinkMemeGenerator):
+    """Renders memes locally on cached template backgrounds instead of calling memegen.link"""
+    render_backend = "pillow"
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self.template_dir = Path(config.template_image_dir)
+        self.template_dir.mkdir(parents=True, exist_ok=True)
+        self.font_path = config.meme_font_path
+        self._backgrounds: Dict[str, Image.Image] = {}
+        self._downloads = SingleFlight("template_download")
+
+    def warmup(self) -> None:
+        super().warmup()
+        load_font(self.font_path, 48)
+
+    async def render(self, template_id: str, texts: List[str], image_format: str = "png") -> bytes:
+        background = await self._background(template_id)
+        layout = TEMPLATE_LAYOUTS.get(template_id) or default_layout(self.catalog.lines(template_id) or len(texts))
+        return await asyncio.to_thread(self._draw, background, layout, texts, image_format)
+
+    async def _background(self, template_id: str) -> Image.Image:
+        background = self._backgrounds.get(template_id)
+        if background is None:
+            background = await self._downloads.do(template_id, lambda: self._load_background(template_id))
+        return background
+
+    async def _load_background(self, template_id: str) -> Image.Image:
+        await self.catalog.ensure_loaded()
+        template = self.catalog.get(template_id)
+        if not template or not template.get("blank"):
+            raise ValueError(f"No blank image known for template {template_id}")
+        suffix = Path(template["blank"]).suffix or ".png"
+        path = self.template_dir / f"{template_id}{suffix}"
+        if not path.exists():
+            logger.info(f"Downloading template background {template['blank']}")
+            response = await self.http_client.get(template["blank"])
+            response.raise_for_status()
+            path.write_bytes(response.content)
+
+        def load() -> Image.Image:
+            with Image.open(path) as image:
+                return image.convert("RGB")
+
+        background = await asyncio.to_thread(load)
+        self._backgrounds[template_id] = background
+        return background
+
+    def _draw(self, background: Image.Image, layout: List[Box], texts: List[str], image_format: str = "png") -> bytes:
+        image = background.copy()
+        draw = ImageDraw.Draw(image)
+        width, height = image.size
+        # extra texts share the last box rather than being dropped
+        if len(texts) > len(layout):
+            texts = texts[:len(layout) - 1] + [" ".join(texts[len(layout) - 1:])]
+
+        for text, (left, top, box_width, box_height) in zip(texts, layout):
+            text = text.strip().upper()
+            if not text:
+                continue
+            box = (int(left * width), int(top * height), int(box_width * width), int(box_height * height))
+            self._draw_text(draw, text, box)
+
+        return image_codec.encode(image, image_format, self.config.image_quality)
+
+    def _draw_text(self, draw: ImageDraw.ImageDraw, text: str, box: Tuple[int, int, int, int]):
+        x, y, box_width, box_height = box
+        padding = max(4, box_width // 40)
+        max_width = box_width - 2 * padding
+
+        # shrink the font until the wrapped text fits the box
+        size = max(MIN_FONT_SIZE, min(box_height // 2, box_width // 6))
+        while True:
+            font = load_font(self.font_path, size)
+            lines = self._wrap(draw, text, font, max_width)
+            line_height = int(size * 1.15)
+            fits = line_height * len(lines) <= box_height - 2 * padding and all(
+                draw.textlength(line, font=font) <= max_width for line in lines
+            )
+            if fits or size <= MIN_FONT_SIZE:
+                break
+            size = max(MIN_FONT_SIZE, int(size * 0.85))
+        if not fits:
+            lines = self._hard_wrap(draw, lines, font, max_width)
+
+        stroke = max(1, size // 15)
+        text_y = y + (box_height - line_height * len(lines)) // 2
+        for line in lines:
+            line_width = draw.textlength(line, font=font)
+            text_x = x + (box_width - line_width) / 2
+            draw.text(
+                (text_x, text_y),
+                line,
+                font=font,
+                fill="white",
+                stroke_width=stroke,
+                stroke_fill="black",
+            )
+            text_y += line_height
+
+    @staticmethod
+    def _wrap(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont, max_width: int) -> List[str]:
+        words = text.split()
+        lines: List[str] = []
+        current = ""
+        for word in words:
+            candidate = f"{current} {word}".strip()
+            if draw.textlength(candidate, font=font) <= max_width or not current:
+                current = candidate
+            else:
+                lines.append(current)
+                current = word
+        if current:
+            lines.append(current)
+        return lines
+
+    @staticmethod
+    def _hard_wrap(draw: ImageDraw.ImageDraw, lines: List[str], font: ImageFont.ImageFont, max_width: int) -> List[str]:
+        """Split words that are wider than the box even at the smallest font size"""
+        wrapped: List[str] = []
+        for line in lines:
+            if draw.textlength(line, font=font) > max_width and len(line) > 1:
+                average = draw.textlength(line, font=font) / len(line)
+                wrapped.extend(textwrap.wrap(line, max(1, int(max_width / average))))
+            else:
+                wrapped.append(line)
+        return wrapped
@@ -0,0 +1,19 @@
+import time
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+
+from app.services.metrics import server_timing_header, start_request_timings
+
+
+class ServerTimingMiddleware(BaseHTTPMiddleware):
+    """Adds a Server-Timing header with the time spent per campaign stage.
+
+    Streaming responses send their headers first, so they only report the stages finished by then.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        timings = start_request_timings()
+        response = await call_next(request)
+        response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - start)
+        return response
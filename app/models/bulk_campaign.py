@@ -0,0 +1,15 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class BulkCampaignItem(BaseModel):
+    """One website of a bulk campaign request"""
+    url: str = Field(description="Website of the business")
+    num_memes: int = Field(default=1, ge=1, le=20, description="Memes to generate for this website")
+
+
+class BulkCampaignRequest(BaseModel):
+    """Many meme campaigns generated in one request"""
+    campaigns: List[BulkCampaignItem] = Field(min_length=1, description="Websites and how many memes each gets")
+    format: Optional[Literal["png", "webp", "jpg"]] = Field(default=None, description="Image format of every meme")
+    concurrency: Optional[int] = Field(default=None, ge=1, description="Max memes rendered at once per campaign")
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+
+class MemeImageResult(BaseModel):
+    """Outcome of rendering a single meme concept"""
+    url: Optional[str] = Field(default=None, description="URL of the rendered meme image")
+    variants: Dict[str, str] = Field(default_factory=dict, description="URLs of the downscaled copies, by variant name")
+    error: Optional[str] = Field(default=None, description="Why the meme could not be rendered")
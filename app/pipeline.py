@@ -0,0 +1,50 @@
+import logging
+from typing import AsyncIterator, Dict, Optional
+
+from app.agents.business_analyzer import BusinessAnalyzer
+from app.agents.meme_generator import MemeImageGenerator
+from app.agents.meme_template_generator import MemeCampaignGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignPipeline:
+    """Runs the analyzer, campaign and image stages and reports every intermediate result"""
+
+    def __init__(
+        self,
+        business_analyzer: BusinessAnalyzer,
+        meme_campaign_generator: MemeCampaignGenerator,
+        meme_generator: MemeImageGenerator,
+    ):
+        self.business_analyzer = business_analyzer
+        self.meme_campaign_generator = meme_campaign_generator
+        self.meme_generator = meme_generator
+
+    async def events(
+        self, url: str, num_memes: int = 1, concurrency: Optional[int] = None, image_format: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """Yield the business profile, then each meme concept, then each image as soon as it is rendered.
+
+        A `stage` event announces the start of every stage so consumers can report progress.
+        """
+        try:
+            yield {"event": "stage", "stage": "profile"}
+            business_profile = await self.business_analyzer.do(url)
+            yield {"event": "profile", "data": business_profile.model_dump()}
+
+            yield {"event": "stage", "stage": "concepts"}
+            meme_content = await self.meme_campaign_generator.do(business_profile, num_memes)
+            for index, meme in enumerate(meme_content):
+                yield {"event": "concept", "index": index, "data": meme.model_dump()}
+        except Exception as e:
+            logger.error(f"Meme campaign for {url} failed: {str(e)}")
+            yield {"event": "error", "message": str(e)}
+            return
+
+        yield {"event": "stage", "stage": "images", "total": len(meme_content)}
+        async for index, result in self.meme_generator.iter_many(
+            business_profile.name, meme_content, concurrency, image_format
+        ):
+            yield {"event": "image", "index": index, **result.model_dump()}
+        yield {"event": "done"}
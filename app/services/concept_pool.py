@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List
+
+from app.models.meme_content import MemeContent
+
+
+def concept_fingerprint(meme: MemeContent) -> str:
+    """Identifies a concept by template and texts, ignoring case and whitespace"""
+    key = json.dumps([meme.template_name.strip().lower(), [" ".join(text.lower().split()) for text in meme.texts]])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class ConceptPool:
+    """Pre-generated meme concepts per business profile, each concept is handed out at most once"""
+
+    def __init__(self, ttl: float, max_profiles: int = 1024):
+        self.ttl = ttl
+        self.max_profiles = max_profiles
+        self._pools: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"served_from_pool": 0, "pooled": 0, "duplicates_dropped": 0, "expired": 0}
+
+    def _pool(self, key: str) -> Dict:
+        pool = self._pools.get(key)
+        if pool is not None and pool["expires_at"] < time.time():
+            self.counters["expired"] += len(pool["concepts"])
+            del self._pools[key]
+            pool = None
+        if pool is None:
+            pool = {"concepts": deque(), "pooled": set(), "served": set(), "expires_at": time.time() + self.ttl}
+            self._pools[key] = pool
+            while len(self._pools) > self.max_profiles:
+                self._pools.popitem(last=False)
+        self._pools.move_to_end(key)
+        return pool
+
+    def take(self, key: str, count: int) -> List[MemeContent]:
+        """Hand out up to `count` pooled concepts and mark them as served"""
+        with self._lock:
+            pool = self._pool(key)
+            taken = []
+            while pool["concepts"] and len(taken) < count:
+                meme = pool["concepts"].popleft()
+                fingerprint = concept_fingerprint(meme)
+                pool["pooled"].discard(fingerprint)
+                pool["served"].add(fingerprint)
+                taken.append(meme)
+            self.counters["served_from_pool"] += len(taken)
+            return taken
+
+    def prefer_unseen(self, key: str, memes: List[MemeContent]) -> List[MemeContent]:
+        """Order concepts so the ones nobody has received yet come first"""
+        with self._lock:
+            pool = self._pool(key)
+            seen = pool["served"] | pool["pooled"]
+        unseen = [meme for meme in memes if concept_fingerprint(meme) not in seen]
+        return unseen + [meme for meme in memes if concept_fingerprint(meme) in seen]
+
+    def mark_served(self, key: str, memes: List[MemeContent]) -> None:
+        """Record concepts handed out without going through the pool"""
+        with self._lock:
+            pool = self._pool(key)
+            for meme in memes:
+                pool["served"].add(concept_fingerprint(meme))
+
+    def add(self, key: str, memes: List[MemeContent]) -> int:
+        """Pool new concepts, dropping any that were already pooled or served; returns how many were kept"""
+        with self._lock:
+            pool = self._pool(key)
+            added = 0
+            for meme in memes:
+                fingerprint = concept_fingerprint(meme)
+                if fingerprint in pool["pooled"] or fingerprint in pool["served"]:
+                    self.counters["duplicates_dropped"] += 1
+                    continue
+                pool["concepts"].append(meme)
+                pool["pooled"].add(fingerprint)
+                added += 1
+            pool["expires_at"] = time.time() + self.ttl
+            self.counters["pooled"] += added
+            return added
+
+    def size(self, key: str) -> int:
+        with self._lock:
+            return len(self._pool(key)["concepts"])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "profiles": len(self._pools),
+                "available": sum(len(pool["concepts"]) for pool in self._pools.values()),
+            }
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.config import Config
+from app.utils import normalize_url, write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class WebsiteContentCache:
+    """Disk cache of extracted website text with TTL, HTTP validators and size-bounded LRU eviction"""
+    # bump when the extracted text changes shape, older entries are then treated as misses
+    version = 2
+
+    def __init__(self, config: Config):
+        self.cache_dir = Path(config.web_cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = config.web_cache_ttl
+        self.max_bytes = config.web_cache_max_bytes
+        self.total_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.json"))
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "evictions": 0}
+        # lookups and writes run in the asyncio.to_thread pool, the byte total and counters are shared between them
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def lookup(self, url: str) -> Tuple[Optional[Dict], bool]:
+        """Return the cached entry for a URL and whether it is still fresh"""
+        path = self._path(url)
+        try:
+            with open(path, "r") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None, False
+        if entry.get("version") != self.version:
+            self._count("misses")
+            return None, False
+
+        # the file mtime doubles as the LRU clock for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            # evicted since we read it
+            pass
+        if time.time() - entry["fetched_at"] < self.ttl:
+            self._count("hits")
+            return entry, True
+        self._count("stale")
+        return entry, False
+
+    def put(self, url: str, content: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict:
+        entry = {
+            "version": self.version,
+            "url": normalize_url(url),
+            "content": content,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        self._write(self._path(url), entry)
+        return entry
+
+    def revalidated(self, url: str, entry: Dict) -> Dict:
+        """The origin answered 304 Not Modified, restart the TTL of the entry"""
+        self._count("revalidated")
+        entry["fetched_at"] = time.time()
+        self._write(self._path(url), entry)
+        return entry
+
+    @staticmethod
+    def validators(entry: Dict) -> Dict[str, str]:
+        """Conditional request headers for revalidating an entry"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _write(self, path: Path, entry: Dict):
+        data = json.dumps(entry).encode("utf-8")
+        with self._lock:
+            try:
+                previous_size = path.stat().st_size
+            except FileNotFoundError:
+                previous_size = 0
+            write_atomic(path, data)
+            self.total_bytes += len(data) - previous_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Called with the lock held"""
+        entries = sorted(self.cache_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        # drop least recently used entries until we are comfortably below the limit
+        target = self.max_bytes * 0.9
+        for path in entries:
+            if self.total_bytes <= target:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            self.total_bytes -= size
+            self.counters["evictions"] += 1
+        logger.info(f"Evicted website cache entries, {self.total_bytes} bytes in use")
+
+    def stats(self) -> Dict:
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["stale"]
+        return {
+            **self.counters,
+            "hit_ratio": round((self.counters["hits"] + self.counters["revalidated"]) / lookups, 3) if lookups else None,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,207 @@
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+# never contain readable page content
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "canvas", "select", "button", "form"}
+# page chrome, kept out of the main content
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "dialog"}
+BOILERPLATE_HINTS = re.compile(
+    r"cookie|consent|banner|gdpr|nav|menu|footer|sidebar|modal|popup|newsletter|subscribe|breadcrumb|share|social|skip",
+    re.IGNORECASE,
+)
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "td", "th", "tr", "table", "blockquote",
+    "h1", "h2", "h3", "h4", "h5", "h6", "dd", "dt", "figcaption", "br", "hr",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+# feature lists, product cards and the like are short by nature
+ITEM_TAGS = {"li", "dt", "dd", "td", "th", "figcaption"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+META_NAMES = {"description", "og:title", "og:description", "og:site_name", "og:type", "twitter:description"}
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class ContentExtractor(HTMLParser):
+    """Incremental HTML to text extractor that keeps the title, meta tags and main-content blocks.
+
+    Feed it chunks as they arrive and stop reading once `done` is set, the token budget is reached by then.
+    When less than `min_content_chars` of main content is found, all visible text of the page is used instead.
+    """
+
+    def __init__(self, token_budget: int = 1500, min_block_chars: int = 40, min_content_chars: int = 100):
+        super().__init__(convert_charrefs=True)
+        self.token_budget = token_budget
+        self.min_block_chars = min_block_chars
+        self.min_content_chars = min_content_chars
+        self.title = ""
+        self.meta: Dict[str, str] = {}
+        self.blocks: List[str] = []
+        self.tokens = 0
+        # every visible block, boilerplate included, for pages the scoring keeps too little of
+        self.visible_blocks: List[str] = []
+        self.visible_tokens = 0
+        self.done = False
+        # open elements as (tag, is_boilerplate)
+        self._stack: List[Tuple[str, bool]] = []
+        self._skip_depth = 0
+        self._boilerplate_depth = 0
+        self._in_title = False
+        self._in_link = 0
+        self._text: List[str] = []
+        self._visible_text: List[str] = []
+        self._link_chars = 0
+        self._heading = False
+        self._item = False
+        self._seen = set()
+        self._seen_visible = set()
+
+    def feed(self, data: str):
+        if not self.done:
+            super().feed(data)
+
+    def handle_starttag(self, tag: str, attrs):
+        attributes = dict(attrs)
+        if tag == "meta":
+            self._handle_meta(attributes)
+            return
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS:
+                self._flush()
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        boilerplate = tag in BOILERPLATE_TAGS or bool(
+            BOILERPLATE_HINTS.search(f"{attributes.get('id') or ''} {attributes.get('class') or ''} {attributes.get('role') or ''}")
+        )
+        # main/article content is never boilerplate, even if its class says "nav-aware" or the like
+        if tag in ("main", "article"):
+            boilerplate = False
+        if boilerplate:
+            self._boilerplate_depth += 1
+        self._stack.append((tag, boilerplate))
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._heading = tag in HEADING_TAGS
+            self._item = tag in ITEM_TAGS
+        if tag == "a":
+            self._in_link += 1
+
+    def handle_endtag(self, tag: str):
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag not in {open_tag for open_tag, _ in self._stack}:
+            return
+        # close everything up to the matching tag, browsers are lenient with unclosed elements too
+        while self._stack:
+            open_tag, boilerplate = self._stack.pop()
+            if open_tag in SKIP_TAGS:
+                self._skip_depth -= 1
+            if boilerplate:
+                self._boilerplate_depth -= 1
+            if open_tag == "a":
+                self._in_link -= 1
+            if open_tag in BLOCK_TAGS:
+                self._flush()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        self._visible_text.append(data)
+        if self._boilerplate_depth:
+            return
+        self._text.append(data)
+        if self._in_link:
+            self._link_chars += len(data.strip())
+
+    def _handle_meta(self, attributes: Dict[str, Optional[str]]):
+        name = (attributes.get("property") or attributes.get("name") or "").lower()
+        content = (attributes.get("content") or "").strip()
+        if name in META_NAMES and content and name not in self.meta:
+            self.meta[name] = content
+
+    def _flush(self):
+        self._flush_visible()
+        text = " ".join("".join(self._text).split())
+        link_chars = self._link_chars
+        heading, item = self._heading, self._item
+        self._text = []
+        self._link_chars = 0
+        self._heading = self._item = False
+        if not text or self.done or not self._keep(text, link_chars, heading, item):
+            return
+        self._seen.add(text)
+        self.blocks.append(text)
+        self.tokens += estimate_tokens(text)
+        if self.tokens >= self.token_budget:
+            self.done = True
+
+    def _flush_visible(self):
+        text = " ".join("".join(self._visible_text).split())
+        self._visible_text = []
+        if not text or text in self._seen_visible or self.visible_tokens >= self.token_budget:
+            return
+        self._seen_visible.add(text)
+        self.visible_blocks.append(text)
+        self.visible_tokens += estimate_tokens(text)
+
+    def _keep(self, text: str, link_chars: int, heading: bool, item: bool = False) -> bool:
+        """Score a block, short link lists and repeated snippets are boilerplate"""
+        if text in self._seen:
+            return False
+        if heading:
+            return len(text) >= 3
+        link_density = link_chars / len(text)
+        if item:
+            # a list item that is mostly a link is a menu entry
+            return len(text) >= 3 and link_density < 0.5
+        words = len(text.split())
+        score = min(len(text), 400) / 400 + min(text.count(".") + text.count(","), 5) / 5 - 2 * link_density
+        # unpunctuated marketing copy scores low but is still content when it links nowhere
+        return len(text) >= self.min_block_chars and words >= 6 and (score > 0.3 or link_density == 0)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def text(self) -> str:
+        """Title and meta tags first, then the content blocks in page order"""
+        lines = []
+        if self.title.strip():
+            lines.append(f"Title: {' '.join(self.title.split())}")
+        seen = {" ".join(self.title.split())}
+        for name in ("og:site_name", "og:title", "description", "og:description", "twitter:description", "og:type"):
+            value = self.meta.get(name)
+            # sites often repeat the same sentence in every description tag
+            if value and value not in seen:
+                seen.add(value)
+                lines.append(f"{name}: {value}")
+        if lines:
+            lines.append("")
+        content = sum(len(block) for block in self.blocks)
+        if content < self.min_content_chars and content < sum(len(block) for block in self.visible_blocks):
+            lines.extend(self.visible_blocks)
+        else:
+            lines.extend(self.blocks)
+        return "\n".join(lines)
+
+
+def extract_text(html: str, token_budget: int = 1500) -> str:
+    """Extract the main content of a complete HTML document"""
+    extractor = ContentExtractor(token_budget)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
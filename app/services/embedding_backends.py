@@ -0,0 +1,87 @@
+import json
+import logging
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+# written by scripts/export_onnx_embedding.py next to model.onnx and tokenizer.json
+ONNX_MANIFEST = "encoder.json"
+
+
+def load_sentence_transformer():
+    # importing sentence_transformers pulls in PyTorch, only pay for it when this backend is selected
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+
+class OnnxEncoder:
+    """Sentence encoder on ONNX Runtime, a drop-in for SentenceTransformer.encode without PyTorch.
+
+    Runs the exported transformer, then applies the same mean pooling and L2 normalization as the
+    all-MiniLM-L6-v2 SentenceTransformer pipeline.
+    """
+
+    def __init__(self, model_dir: Union[str, Path], threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        manifest_path = model_dir / ONNX_MANIFEST
+        if not manifest_path.exists():
+            raise FileNotFoundError(
+                f"No exported embedding model in {model_dir}, run scripts/export_onnx_embedding.py first"
+            )
+        self.manifest = json.loads(manifest_path.read_text())
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir / self.manifest["model"]), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.manifest["max_seq_length"])
+        self.tokenizer.enable_padding()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.manifest["dimension"]
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), self.manifest["dimension"]), dtype=np.float32)
+        # batch similar lengths together so little compute goes into padding, like SentenceTransformer does
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            positions = order[start:start + batch_size]
+            vectors[positions] = self._encode_batch([texts[position] for position in positions])
+        return vectors[0] if single else vectors
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+
+def load_encoder(backend: str, onnx_dir: str, threads: int = 0):
+    """Load the sentence encoder of an EMBEDDING_BACKEND"""
+    if backend == "sentence-transformers":
+        return load_sentence_transformer()
+    elif backend == "onnx":
+        return OnnxEncoder(onnx_dir, threads)
+    else:
+        raise ValueError(f"Invalid embedding backend: {backend}")
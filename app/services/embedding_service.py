@@ -0,0 +1,331 @@
+"""Embedding sidecar: one model instance serving every worker process over a Unix socket.
+
+Requests from all connections are merged into micro-batches, closed once they hold `max_batch` texts or `max_wait`
+seconds after the first one arrived, and encoded with a single encode() call.
+
+Run standalone with:
+    python -m app.services.embedding_service [--socket PATH] [--max-batch N] [--max-wait-ms MS] [--idle-timeout S]
+
+Wire format: every message is a 4 byte big-endian length followed by the payload. A request is one JSON frame,
+{"texts": [...]} or {"op": "stats"}; the response is a JSON header frame followed, for texts, by a frame of
+float32 vectors in row-major order.
+"""
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct(">I")
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    return await reader.readexactly(length)
+
+
+def _write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+class EmbeddingServer:
+    """Serves encode() of one encoder to many clients, batching their requests together"""
+
+    def __init__(self, encoder, socket_path: str, max_batch: int = 64, max_wait: float = 0.005, idle_timeout: float = 0):
+        self.encoder = encoder
+        self.socket_path = Path(socket_path)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.last_request = time.monotonic()
+        # workers keep one connection per thread open for as long as they live
+        self.connections: Set[asyncio.StreamWriter] = set()
+        self.counters = {"requests": 0, "texts": 0, "batches": 0, "largest_batch": 0, "errors": 0}
+
+    async def serve(self):
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle, path=str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        batcher = asyncio.create_task(self._batch_loop())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        logger.info(
+            f"Embedding service listening on {self.socket_path} "
+            f"(max batch {self.max_batch}, max wait {self.max_wait * 1000:.1f}ms)"
+        )
+        try:
+            async with server:
+                try:
+                    while not stop.is_set():
+                        try:
+                            await asyncio.wait_for(stop.wait(), timeout=max(self.idle_timeout / 4, 1))
+                        except asyncio.TimeoutError:
+                            pass
+                        # idle means no worker is connected any more, not just a quiet spell
+                        if (self.idle_timeout and not self.connections
+                                and time.monotonic() - self.last_request > self.idle_timeout):
+                            logger.info(f"Embedding service idle for {self.idle_timeout:.0f}s, shutting down")
+                            break
+                finally:
+                    # leaving the server context waits for open connections on Python 3.12.1+, close them first
+                    server.close()
+                    for writer in list(self.connections):
+                        writer.close()
+        finally:
+            batcher.cancel()
+            self.socket_path.unlink(missing_ok=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections.add(writer)
+        try:
+            while True:
+                request = json.loads(await _read_frame(reader))
+                self.last_request = time.monotonic()
+                if request.get("op") == "stats":
+                    _write_frame(writer, json.dumps(self.stats()).encode())
+                    await writer.drain()
+                    continue
+
+                texts = request["texts"]
+                self.counters["requests"] += 1
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((texts, future))
+                try:
+                    vectors = await future
+                except Exception as e:
+                    self.counters["errors"] += 1
+                    _write_frame(writer, json.dumps({"error": str(e)}).encode())
+                    _write_frame(writer, b"")
+                else:
+                    _write_frame(writer, json.dumps({"count": vectors.shape[0], "dimension": vectors.shape[1]}).encode())
+                    _write_frame(writer, vectors.tobytes())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # shutting down with idle clients still connected
+            pass
+        finally:
+            self.connections.discard(writer)
+            # the idle timeout counts from the last worker going away
+            self.last_request = time.monotonic()
+            writer.close()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            size = len(jobs[0][0])
+            # the window opens with the first request, later ones join until the batch is full or the window closes
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        job = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    job = self.queue.get_nowait()
+                jobs.append(job)
+                size += len(job[0])
+            await self._encode(jobs, size)
+
+    async def _encode(self, jobs: List[Tuple[List[str], asyncio.Future]], size: int):
+        texts = [text for job_texts, _ in jobs for text in job_texts]
+        try:
+            vectors = await asyncio.to_thread(self.encoder.encode, texts, batch_size=self.max_batch, convert_to_numpy=True)
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        except Exception as e:
+            logger.exception(f"Failed to encode a batch of {len(texts)} text(s): {e}")
+            for _, future in jobs:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.counters["batches"] += 1
+        self.counters["texts"] += size
+        self.counters["largest_batch"] = max(self.counters["largest_batch"], size)
+        offset = 0
+        for job_texts, future in jobs:
+            if not future.done():
+                future.set_result(vectors[offset:offset + len(job_texts)])
+            offset += len(job_texts)
+
+    def stats(self) -> Dict:
+        batches = self.counters["batches"]
+        return {
+            **self.counters,
+            "average_batch": round(self.counters["texts"] / batches, 2) if batches else 0,
+            "queued": self.queue.qsize(),
+            "pid": os.getpid(),
+        }
+
+
+class EmbeddingServiceClient:
+    """Talks to the embedding sidecar, a drop-in for SentenceTransformer.encode that is safe to call from any thread"""
+
+    def __init__(self, socket_path: str, timeout: float = 60, spawn: bool = False, idle_timeout: float = 900,
+                 startup_timeout: float = 180):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        # a spawned sidecar exits when idle, the next call then starts a new one
+        self.spawn = spawn
+        self.idle_timeout = idle_timeout
+        self.startup_timeout = startup_timeout
+        # one connection per thread, encode() runs in the asyncio.to_thread pool
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            try:
+                connection.connect(self.socket_path)
+            except OSError:
+                connection.close()
+                raise
+            self._local.connection = connection
+        return connection
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _receive(self, connection: socket.socket) -> bytes:
+        (length,) = FRAME_HEADER.unpack(self._receive_exactly(connection, FRAME_HEADER.size))
+        return self._receive_exactly(connection, length)
+
+    @staticmethod
+    def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Embedding service closed the connection")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _call(self, request: Dict, with_body: bool) -> Tuple[Dict, bytes]:
+        payload = self._frame(request)
+        try:
+            return self._exchange(payload, with_body)
+        except OSError:
+            # a connection the service closed since the last call is only noticed on use, retry once on a fresh one
+            self._close()
+            if self.spawn:
+                self.start()
+        try:
+            return self._exchange(payload, with_body)
+        except OSError:
+            self._close()
+            raise
+
+    @staticmethod
+    def _frame(request: Dict) -> bytes:
+        body = json.dumps(request).encode()
+        return FRAME_HEADER.pack(len(body)) + body
+
+    def _exchange(self, payload: bytes, with_body: bool) -> Tuple[Dict, bytes]:
+        connection = self._connection()
+        connection.sendall(payload)
+        header = json.loads(self._receive(connection))
+        body = self._receive(connection) if with_body else b""
+        return header, body
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        header, body = self._call({"texts": texts}, with_body=True)
+        if "error" in header:
+            raise RuntimeError(f"Embedding service failed: {header['error']}")
+        vectors = np.frombuffer(body, dtype=np.float32).reshape(header["count"], header["dimension"])
+        return vectors[0] if single else vectors
+
+    def ping(self) -> bool:
+        try:
+            self._exchange(self._frame({"op": "stats"}), with_body=False)
+            return True
+        except OSError:
+            self._close()
+            return False
+
+    def start(self):
+        """Start the sidecar unless it is running, concurrent callers across processes wait for the first one"""
+        if self.ping():
+            return
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{self.socket_path}.lock", "w") as lock:
+            # the other workers wait here until the sidecar is up instead of loading the model themselves
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.ping():
+                return
+            logger.info(f"Starting the embedding service on {self.socket_path}")
+            process = subprocess.Popen(
+                [sys.executable, "-m", "app.services.embedding_service", "--socket", self.socket_path,
+                 "--idle-timeout", str(self.idle_timeout)],
+                # outlives the worker that started it, it is shared by all of them and exits once idle
+                start_new_session=True,
+            )
+            deadline = time.monotonic() + self.startup_timeout
+            while not self.ping():
+                if process.poll() is not None:
+                    raise RuntimeError(f"Embedding service exited with code {process.returncode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Embedding service did not start within {self.startup_timeout:.0f}s")
+                time.sleep(0.1)
+
+    def stats(self) -> Dict:
+        return self._call({"op": "stats"}, with_body=False)[0]
+
+
+def connect(socket_path: str, spawn: bool, idle_timeout: float = 900) -> EmbeddingServiceClient:
+    """Client for the sidecar on `socket_path`, with `spawn` the first worker to get here starts it"""
+    client = EmbeddingServiceClient(socket_path, spawn=spawn, idle_timeout=idle_timeout)
+    if spawn:
+        client.start()
+    return client
+
+
+def main():
+    from app import utils
+    from app.services.embedding_backends import load_encoder
+
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings to all workers over a Unix socket")
+    parser.add_argument("--socket", default=utils.EMBEDDING_SERVICE_SOCKET)
+    parser.add_argument("--max-batch", type=int, default=utils.EMBEDDING_SERVICE_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=utils.EMBEDDING_SERVICE_MAX_WAIT_MS)
+    parser.add_argument("--idle-timeout", type=float, default=0, help="exit after this many idle seconds, 0 never")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    encoder = load_encoder(utils.EMBEDDING_BACKEND, utils.EMBEDDING_ONNX_DIR, utils.EMBEDDING_THREADS)
+    server = EmbeddingServer(encoder, args.socket, args.max_batch, args.max_wait_ms / 1000, args.idle_timeout)
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
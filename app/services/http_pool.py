@@ -0,0 +1,71 @@
+import logging
+from collections import Counter
+from typing import Dict
+
+import httpx
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class SingletonMeta(type):
+    _instances = {}
+
+    def __call__(cls, config: Config, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super().__call__(config, *args, **kwargs)
+        return cls._instances[cls]
+
+
+class HttpClientPool(metaclass=SingletonMeta):
+    """Named, shared keep-alive httpx clients so every stage reuses warm TCP/TLS connections"""
+
+    def __init__(self, config: Config):
+        self.limits = httpx.Limits(
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive_connections,
+            keepalive_expiry=config.http_keepalive_expiry,
+        )
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.counters: Dict[str, Counter] = {}
+
+    def get(self, name: str, **client_kwargs) -> httpx.AsyncClient:
+        """Return the client for `name`, created with `client_kwargs` on first use"""
+        client = self.clients.get(name)
+        if client is None:
+            counter = self.counters.setdefault(name, Counter())
+
+            async def on_request(request: httpx.Request):
+                counter["requests"] += 1
+
+            async def on_response(response: httpx.Response):
+                counter[f"responses_{response.status_code // 100}xx"] += 1
+
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                event_hooks={"request": [on_request], "response": [on_response]},
+                **client_kwargs,
+            )
+            self.clients[name] = client
+        return client
+
+    def stats(self) -> Dict:
+        stats = {}
+        for name, client in self.clients.items():
+            # httpx does not expose its pool publicly, look through the default transport
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            stats[name] = {
+                **self.counters[name],
+                "connections": len(connections),
+                "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+            }
+        return stats
+
+    async def aclose(self):
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
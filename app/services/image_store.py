@@ -0,0 +1,268 @@
+import asyncio
+import fcntl
+import logging
+import os
+import re
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Set, Tuple
+
+from app.config import Config
+from app.services import image_codec
+from app.services.metrics import timed
+from app.services.minio import MinioClient
+from app.services.single_flight import SingleFlight
+from app.utils import backoff_delay, write_atomic
+
+logger = logging.getLogger(__name__)
+
+OBJECT_NAME = re.compile(r"^[\w.-]+$")
+CONTENT_TYPE_SUFFIX = ".content-type"
+
+
+class SingletonMeta(type):
+    _instances = {}
+
+    def __call__(cls, config: Config, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super().__call__(config, *args, **kwargs)
+        return cls._instances[cls]
+
+
+class ImageStore(metaclass=SingletonMeta):
+    """Write-behind image storage: images land in a local spool and are uploaded to MinIO in the background.
+
+    `put` returns a stable URL served by the /images route, which reads from the spool until the upload
+    finished and redirects to MinIO afterwards.
+    """
+
+    def __init__(self, config: Config):
+        self.minio_client = MinioClient(config)
+        self.spool_dir = Path(config.image_spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.base_url = config.image_base_url.rstrip("/")
+        self.worker_count = config.image_upload_workers
+        self.retries = config.image_upload_retries
+        self.part_size = config.image_multipart_part_size
+        self.quality = config.image_quality
+        self.variant_sizes = image_codec.parse_variants(config.image_variants)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=config.image_upload_queue_size)
+        self.workers: List[asyncio.Task] = []
+        self.requeue_task: Optional[asyncio.Task] = None
+        # queued or uploading, an object is only ever in the queue once
+        self.pending: Set[str] = set()
+        # variants are encoded by the upload workers, original object name -> image format
+        self.variant_jobs: Dict[str, str] = {}
+        # variant object name -> original, while the variant is not encoded yet
+        self.variant_sources: Dict[str, str] = {}
+        # object names are content addressed, concurrent puts of one name write it once
+        self.puts = SingleFlight("image_put")
+        self.counters = {"spooled": 0, "uploaded": 0, "multipart": 0, "retried": 0, "failed": 0, "claimed_elsewhere": 0}
+
+    def url(self, object_name: str) -> str:
+        return f"{self.base_url}/{object_name}"
+
+    def variant_name(self, object_name: str, variant: str) -> str:
+        stem, extension = object_name.rsplit(".", 1)
+        return f"{stem}_{variant}.{extension}"
+
+    def variant_urls(self, url: str) -> Dict[str, str]:
+        """URLs of the downscaled copies stored next to an image put() returned `url` for"""
+        if not url.startswith(f"{self.base_url}/"):
+            return {}
+        object_name = url[len(self.base_url) + 1:]
+        return {variant: self.url(self.variant_name(object_name, variant)) for variant in self.variant_sizes}
+
+    def spool_path(self, object_name: str) -> Path:
+        if not OBJECT_NAME.match(object_name):
+            raise ValueError(f"Invalid object name: {object_name}")
+        return self.spool_dir / object_name
+
+    def start(self):
+        if self.workers:
+            return
+        self.workers = [asyncio.create_task(self._work(), name=f"image-upload-{i}") for i in range(self.worker_count)]
+        # uploads that did not finish before the last shutdown are still in the spool, files another worker is
+        # uploading right now are skipped by the claim in _upload_file
+        pending = [path for path in self.spool_dir.iterdir() if path.is_file() and OBJECT_NAME.match(path.name)
+                   and not path.name.endswith((CONTENT_TYPE_SUFFIX, ".tmp"))]
+        if pending:
+            self.requeue_task = asyncio.create_task(self._requeue([path.name for path in pending]))
+        logger.info(f"Started {self.worker_count} image upload workers")
+
+    async def stop(self, timeout: float = 10):
+        """Give queued uploads a chance to finish, whatever is left stays in the spool for the next start"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.queue.qsize()} image upload(s) still queued at shutdown, kept in the spool")
+        tasks = [*self.workers, *([self.requeue_task] if self.requeue_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.requeue_task = None
+
+    async def exists(self, object_name: str) -> bool:
+        return self.spool_path(object_name).exists() or await self.minio_client.afile_exists(object_name)
+
+    async def put(self, data: bytes, object_name: str, content_type: str = "image/png") -> str:
+        """Spool the image and queue its upload, waits only when the upload backlog is full"""
+        return await self.puts.do(object_name, lambda: self._put(data, object_name, content_type))
+
+    async def _put(self, data: bytes, object_name: str, content_type: str) -> str:
+        path = self.spool_path(object_name)
+        await asyncio.to_thread(self._write_spool, path, data, content_type)
+        self.counters["spooled"] += 1
+        self.start()
+        await self._enqueue(object_name)
+        return self.url(object_name)
+
+    async def _enqueue(self, object_name: str):
+        if object_name in self.pending:
+            return
+        self.pending.add(object_name)
+        await self.queue.put(object_name)
+
+    async def put_image(self, data: bytes, object_name: str, image_format: str) -> str:
+        """Store an encoded image, its thumbnail/preview variants are encoded in the background before the upload"""
+        if self.variant_sizes:
+            self.variant_jobs[object_name] = image_format
+            for variant in self.variant_sizes:
+                self.variant_sources[self.variant_name(object_name, variant)] = object_name
+        return await self.put(data, object_name, image_codec.content_type(image_format))
+
+    def pending_variant_source(self, object_name: str) -> Optional[str]:
+        """Original of a variant that is still being encoded, serving it meanwhile beats a 404"""
+        return self.variant_sources.get(object_name)
+
+    def variant_original(self, object_name: str) -> Optional[str]:
+        """Original a variant name was derived from, whether or not the variant was ever stored"""
+        if "." not in object_name:
+            return None
+        stem, extension = object_name.rsplit(".", 1)
+        for variant in self.variant_sizes:
+            suffix = f"_{variant}"
+            if stem.endswith(suffix) and len(stem) > len(suffix):
+                return f"{stem[:-len(suffix)]}.{extension}"
+        return None
+
+    @staticmethod
+    def _write_spool(path: Path, data: bytes, content_type: str):
+        # the content type goes first, a spooled image is always served with it; other threads and workers may be
+        # writing the same name
+        write_atomic(path.with_name(path.name + CONTENT_TYPE_SUFFIX), content_type.encode())
+        write_atomic(path, data)
+
+    def spooled(self, object_name: str) -> Optional[Tuple[Path, str]]:
+        """Spool file and content type of an image that is not uploaded yet"""
+        path = self.spool_path(object_name)
+        if not path.exists():
+            return None
+        content_type_path = path.with_name(path.name + CONTENT_TYPE_SUFFIX)
+        content_type = content_type_path.read_text() if content_type_path.exists() else "application/octet-stream"
+        return path, content_type
+
+    async def remote_url(self, object_name: str) -> Optional[str]:
+        if not await self.minio_client.afile_exists(object_name):
+            return None
+        return await self.minio_client.aget_file_url(object_name)
+
+    async def _requeue(self, object_names: List[str]):
+        for object_name in object_names:
+            await self._enqueue(object_name)
+        logger.info(f"Re-queued {len(object_names)} spooled image(s) for upload")
+
+    async def _work(self):
+        while True:
+            object_name = await self.queue.get()
+            try:
+                await self._upload(object_name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Image upload of {object_name} crashed: {e}")
+            finally:
+                self.pending.discard(object_name)
+                self.queue.task_done()
+
+    async def _upload(self, object_name: str):
+        spooled = self.spooled(object_name)
+        if spooled is None:
+            return
+        path, content_type = spooled
+        image_format = self.variant_jobs.pop(object_name, None)
+        if image_format:
+            await self._upload_variants(path, object_name, image_format)
+        await self._upload_file(path, object_name, content_type)
+
+    async def _upload_variants(self, path: Path, object_name: str, image_format: str):
+        try:
+            data = await asyncio.to_thread(path.read_bytes)
+            encoded = await asyncio.to_thread(image_codec.variants, data, image_format, self.quality, self.variant_sizes)
+            for variant, variant_data in encoded.items():
+                variant_name = self.variant_name(object_name, variant)
+                variant_path = self.spool_path(variant_name)
+                await asyncio.to_thread(self._write_spool, variant_path, variant_data, image_codec.content_type(image_format))
+                self.counters["spooled"] += 1
+                self.variant_sources.pop(variant_name, None)
+                await self._upload_file(variant_path, variant_name, image_codec.content_type(image_format))
+        finally:
+            for variant in self.variant_sizes:
+                self.variant_sources.pop(self.variant_name(object_name, variant), None)
+
+    @staticmethod
+    def _claim(path: Path) -> Optional[IO]:
+        """Lock a spool file for uploading, None when it is gone or another worker holds it.
+
+        The lock is released when the returned file is closed or the process dies.
+        """
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # the previous holder uploaded and removed it, or it was replaced since we opened it
+            if os.fstat(handle.fileno()).st_ino != os.stat(path).st_ino:
+                raise FileNotFoundError(path)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    async def _upload_file(self, path: Path, object_name: str, content_type: str):
+        claim = await asyncio.to_thread(self._claim, path)
+        if claim is None:
+            self.counters["claimed_elsewhere"] += 1
+            return
+        try:
+            await self._upload_claimed(path, object_name, content_type)
+        finally:
+            claim.close()
+
+    async def _upload_claimed(self, path: Path, object_name: str, content_type: str):
+        for attempt in range(self.retries):
+            try:
+                with timed("minio_upload"):
+                    multipart = await asyncio.to_thread(
+                        self.minio_client.fput_file, str(path), object_name, content_type, self.part_size
+                    )
+                break
+            except Exception as e:
+                if attempt + 1 >= self.retries:
+                    self.counters["failed"] += 1
+                    logger.error(f"Giving up on uploading {object_name} after {self.retries} attempts: {str(e)}")
+                    return
+                self.counters["retried"] += 1
+                logger.warning(f"Upload of {object_name} failed (attempt {attempt + 1}/{self.retries}): {str(e)}")
+                await asyncio.sleep(backoff_delay(attempt))
+
+        self.counters["uploaded"] += 1
+        if multipart:
+            self.counters["multipart"] += 1
+        # the /images route redirects to MinIO from now on
+        path.unlink(missing_ok=True)
+        path.with_name(path.name + CONTENT_TYPE_SUFFIX).unlink(missing_ok=True)
+
+    def stats(self) -> Dict:
+        return {**self.counters, "queued": self.queue.qsize(), "workers": len(self.workers)}
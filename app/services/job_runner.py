@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from app.pipeline import CampaignPipeline
+from app.services.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["profile", "concepts", "images"]
+
+
+class JobRunner:
+    """Runs campaign jobs on a pool of asyncio workers and records progress in a JobStore"""
+
+    def __init__(self, pipeline: CampaignPipeline, store: JobStore, workers: int = 4, queue_size: int = 100):
+        self.pipeline = pipeline
+        self.store = store
+        self.worker_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.workers: List[asyncio.Task] = []
+
+    def start(self):
+        self.workers = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.worker_count)]
+        self.workers.append(asyncio.create_task(self._recover(), name="job-recovery"))
+        logger.info(f"Started {self.worker_count} job workers")
+
+    async def _recover(self):
+        """Fail jobs whose worker process is gone, they were queued in its memory and will never finish"""
+        try:
+            jobs = await asyncio.to_thread(self.store.unfinished)
+        except Exception as e:
+            logger.warning(f"Could not look for interrupted jobs: {str(e)}")
+            return
+        orphaned = [job for job in jobs if not self._worker_alive(job.get("worker"))]
+        for job in orphaned:
+            job["status"] = "failed"
+            job["error"] = "Interrupted by a worker restart, submit the campaign again"
+            await self._save(job)
+        if orphaned:
+            logger.warning(f"Marked {len(orphaned)} interrupted job(s) as failed")
+
+    @staticmethod
+    def _worker_alive(pid: Optional[int]) -> bool:
+        if pid is None:
+            return False
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # exists, but belongs to someone else
+            return True
+        return True
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def submit(
+        self, url: str, num_memes: int = 1, concurrency: Optional[int] = None, image_format: Optional[str] = None
+    ) -> Dict:
+        """Queue a campaign, raises asyncio.QueueFull when the backlog is at capacity"""
+        job = {
+            "id": uuid4().hex,
+            "status": "queued",
+            # jobs live in this process's queue, a restart orphans them
+            "worker": os.getpid(),
+            "url": url,
+            "num_memes": num_memes,
+            "format": image_format,
+            "stages": {stage: "pending" for stage in STAGES},
+            "progress": {"images_done": 0, "images_total": None},
+            "result": {"business_profile": None, "meme_concepts": [], "meme_images": [], "variants": [], "errors": []},
+            "error": None,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+        }
+        if self.queue.full():
+            raise asyncio.QueueFull()
+        # persist before queueing so a worker never races the initial write
+        await self._save(job)
+        self.queue.put_nowait((job, concurrency))
+        return job
+
+    async def _work(self):
+        while True:
+            job, concurrency = await self.queue.get()
+            try:
+                await self._run(job, concurrency)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Job {job['id']} crashed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+                await self._save(job)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: Dict, concurrency: Optional[int]):
+        job["status"] = "running"
+        stages = job["stages"]
+        result = job["result"]
+        current_stage = None
+
+        async for event in self.pipeline.events(job["url"], job["num_memes"], concurrency, job.get("format")):
+            kind = event["event"]
+            if kind == "stage":
+                if current_stage:
+                    stages[current_stage] = "done"
+                current_stage = event["stage"]
+                stages[current_stage] = "running"
+                if current_stage == "images":
+                    job["progress"]["images_total"] = event["total"]
+                    result["meme_images"] = [None] * event["total"]
+                    result["variants"] = [{} for _ in range(event["total"])]
+                    result["errors"] = [None] * event["total"]
+            elif kind == "profile":
+                result["business_profile"] = event["data"]
+            elif kind == "concept":
+                result["meme_concepts"].append(event["data"])
+            elif kind == "image":
+                result["meme_images"][event["index"]] = event["url"]
+                result["variants"][event["index"]] = event["variants"]
+                result["errors"][event["index"]] = event["error"]
+                job["progress"]["images_done"] += 1
+            elif kind == "error":
+                stages[current_stage] = "failed"
+                job["status"] = "failed"
+                job["error"] = event["message"]
+            elif kind == "done":
+                stages[current_stage] = "done"
+                job["status"] = "completed"
+            await self._save(job)
+
+    async def _save(self, job: Dict):
+        job["updated_at"] = time.time()
+        await asyncio.to_thread(self.store.save, job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
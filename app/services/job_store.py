@@ -0,0 +1,94 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+UNFINISHED = ("queued", "running")
+
+
+class JobStore(ABC):
+    """Persists campaign job state so any request can report on it"""
+
+    @abstractmethod
+    def save(self, job: Dict) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    def unfinished(self) -> List[Dict]:
+        """Jobs that are still queued or running"""
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """Jobs in a bounded in-process dict, only visible to the worker process that runs them"""
+
+    def __init__(self, max_jobs: int = 10000):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict) -> None:
+        with self._lock:
+            # store a snapshot, the runner keeps mutating its own copy
+            self._jobs[job["id"]] = json.loads(json.dumps(job))
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def unfinished(self) -> List[Dict]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job["status"] in UNFINISHED]
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs in a local SQLite file, shared by all workers on the host"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def save(self, job: Dict) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, updated_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), time.time()),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def unfinished(self) -> List[Dict]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT data FROM jobs WHERE json_extract(data, '$.status') IN (?, ?)", UNFINISHED
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+def get_job_store(backend: str, path: str) -> JobStore:
+    """Return the job store selected in the configuration"""
+    if backend == "memory":
+        return MemoryJobStore()
+    elif backend == "sqlite":
+        return SQLiteJobStore(path)
+    else:
+        raise ValueError(f"Invalid job store backend: {backend}")
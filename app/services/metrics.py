@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+# LLM calls take seconds, renders and lookups milliseconds, the buckets cover both
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+
+STAGE_SECONDS = Histogram(
+    "memgen_stage_seconds",
+    "Time spent in each stage of a meme campaign",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+RETRIES = Counter("memgen_retries_total", "Retried agent calls", ["agent"])
+CACHE_LOOKUPS = Counter("memgen_cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+COALESCED = Counter("memgen_coalesced_total", "Calls that joined an identical call already in flight", ["stage"])
+RATE_LIMITED = Counter("memgen_rate_limited_total", "Requests rejected by the rate limiter", ["path"])
+
+# per request stage totals for the Server-Timing header, as stage -> [seconds, count]
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Time a block into the stage histogram and the current request's Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            total = timings.setdefault(stage, [0.0, 0])
+            total[0] += elapsed
+            total[1] += 1
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_retry(agent: str):
+    RETRIES.labels(agent=agent).inc()
+
+
+def record_coalesced(stage: str):
+    COALESCED.labels(stage=stage).inc()
+
+
+def start_request_timings() -> Dict[str, List[float]]:
+    """Collect stage timings of the current request, tasks spawned from it share the same dict"""
+    timings: Dict[str, List[float]] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: Dict[str, List[float]], total: float) -> str:
+    # stages that run concurrently (renders, uploads) report their summed time and how often they ran
+    entries = [
+        f'{stage};dur={seconds * 1000:.1f}' + (f';desc="{count}x"' if count > 1 else "")
+        for stage, (seconds, count) in timings.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -1,6 +1,11 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
 from urllib.parse import urlparse
 from minio import Minio
 from app.config import Config
+from app.services.metrics import timed
 
 class SingletonMeta(type):
     _instances = {}
@@ -24,10 +29,23 @@ class MinioClient(metaclass=SingletonMeta):
             secure=secure
         )
         self.bucket = config.minio_bucket
+        # checked on startup or first upload, not while the app is being imported
+        self.bucket_ready = False
+        # objects we know to exist, saves a stat_object round trip for repeated lookups
+        self.known_objects = OrderedDict()
+        self.known_objects_limit = 100_000
+        # touched from the asyncio.to_thread pool
+        self.known_objects_lock = threading.Lock()
+
+    def ensure_bucket(self):
+        if self.bucket_ready:
+            return
         if not self.client.bucket_exists(self.bucket):
             self.client.make_bucket(self.bucket)
+        self.bucket_ready = True
 
     def put_file(self, file_stream, object_name: str, content_type="image/png"):
+        self.ensure_bucket()
         self.client.put_object(
             bucket_name=self.bucket,
             object_name=object_name,
@@ -35,7 +53,21 @@ class MinioClient(metaclass=SingletonMeta):
             length=file_stream.getbuffer().nbytes,
             content_type=content_type
         )
+        self._remember(object_name)
         return self.client.get_presigned_url("GET",self.bucket, object_name)
+
+    def fput_file(self, file_path: str, object_name: str, content_type="image/png", part_size: int = 0) -> bool:
+        """Upload a file from disk, files larger than `part_size` go up as a multipart upload. Returns whether they did"""
+        self.ensure_bucket()
+        size = os.path.getsize(file_path)
+        self.client.fput_object(self.bucket, object_name, file_path, content_type=content_type, part_size=part_size)
+        self._remember(object_name)
+        return bool(part_size) and size > part_size
+
+    async def aput_file(self, file_stream, object_name: str, content_type="image/png"):
+        """Upload without blocking the event loop; the minio SDK is synchronous"""
+        with timed("minio_upload"):
+            return await asyncio.to_thread(self.put_file, file_stream, object_name, content_type)
     
     def get_file_url(self, object_name: str):
         return self.client.presigned_get_object(self.bucket, object_name)
@@ -45,15 +77,34 @@ class MinioClient(metaclass=SingletonMeta):
 
     def delete_file(self, object_name: str):
         self.client.remove_object(self.bucket, object_name)
+        with self.known_objects_lock:
+            self.known_objects.pop(object_name, None)
 
     def list_files(self):
         objects = self.client.list_objects(self.bucket)
         return [obj.object_name for obj in objects]
     
     def file_exists(self, object_name: str):
+        with self.known_objects_lock:
+            if object_name in self.known_objects:
+                self.known_objects.move_to_end(object_name)
+                return True
         try:
             self.client.stat_object(self.bucket, object_name)
+            self._remember(object_name)
             return True
         except Exception:
             return False
-    
\ No newline at end of file
+
+    def _remember(self, object_name: str):
+        with self.known_objects_lock:
+            self.known_objects[object_name] = True
+            self.known_objects.move_to_end(object_name)
+            if len(self.known_objects) > self.known_objects_limit:
+                self.known_objects.popitem(last=False)
+
+    async def afile_exists(self, object_name: str):
+        return await asyncio.to_thread(self.file_exists, object_name)
+
+    async def aget_file_url(self, object_name: str):
+        return await asyncio.to_thread(self.get_file_url, object_name)
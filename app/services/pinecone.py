@@ -1,3 +1,5 @@
+import asyncio
+
 from app.config import Config
 from pinecone import Pinecone
 class SingletonMeta(type):
@@ -15,17 +17,20 @@ class PineconeClient(metaclass=SingletonMeta):
         self.client = Pinecone(
             api_key=self.api_key,
         )        
+        self.index = self.client.Index(self.index_name)
 
     def query(self, query_vector, top_k=1, include_metadata=True):
-        index = self.client.Index(self.index_name)
-        response = index.query(
+        response = self.index.query(
             vector=query_vector,
             top_k=top_k,
             include_metadata=include_metadata
         )
         return response
+
+    async def aquery(self, query_vector, top_k=1, include_metadata=True):
+        """Query without blocking the event loop; the pinecone SDK is synchronous"""
+        return await asyncio.to_thread(self.query, query_vector, top_k, include_metadata)
     
     def get_all(self):
-        index = self.client.Index(self.index_name)
-        response = index.fetch_all()
+        response = self.index.fetch_all()
         return response
\ No newline at end of file
@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from limits import parse
+from limits.storage import Storage, storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+
+class SQLiteStorage(Storage):
+    """Rate limit counters in a local SQLite file, shared by every worker process on the host.
+
+    Registered with `limits` under the ``sqlite`` scheme: ``sqlite:///relative/path`` or ``sqlite:////absolute/path``.
+    Supports the fixed-window strategy, which is slowapi's default.
+    """
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, **options):
+        path = (uri or "sqlite:///cache/ratelimit.sqlite3")[len("sqlite:///"):]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS limits (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: float, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        # one write transaction, concurrent workers serialize on the SQLite write lock
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                INSERT INTO limits (key, count, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                    expires_at = CASE WHEN expires_at <= ? OR ? THEN excluded.expires_at ELSE expires_at END
+                """,
+                (key, amount, now + expiry, now, now, elastic_expiry),
+            )
+            count = self._connection.execute("SELECT count FROM limits WHERE key = ?", (key,)).fetchone()[0]
+            # piggyback cleanup of expired windows, cheap thanks to the small table
+            if count == amount:
+                self._connection.execute("DELETE FROM limits WHERE expires_at <= ?", (now,))
+        return count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT count FROM limits WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            row = self._connection.execute("SELECT expires_at FROM limits WHERE key = ?", (key,)).fetchone()
+        return row[0] if row and row[0] > time.time() else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        with self._lock, self._connection:
+            return self._connection.execute("DELETE FROM limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM limits WHERE key = ?", (key,))
+
+
+class WeightedQuota:
+    """Fixed-window quota per client where a call costs a given amount, e.g. the memes a request generates.
+
+    `FixedWindowRateLimiter.hit` adds the cost even when it rejects, so one oversized request would use up the rest
+    of the window. The cost is tested first and only charged when it fits.
+    """
+
+    def __init__(self, limit: str, storage_uri: str, prefix: str):
+        self.limit = parse(limit)
+        self.prefix = prefix
+        self.limiter = FixedWindowRateLimiter(storage_from_string(storage_uri))
+
+    def charge(self, client: str, cost: int) -> bool:
+        key = f"{self.prefix}:{client}"
+        if not self.limiter.test(self.limit, key, cost=cost):
+            return False
+        # a concurrent charge can still win the remaining quota between test and hit
+        return self.limiter.hit(self.limit, key, cost=cost)
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from app.services.metrics import record_coalesced
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Shares one in-flight computation between concurrent callers asking for the same key"""
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.shared += 1
+            if self.name:
+                record_coalesced(self.name)
+        # a cancelled caller must not cancel the computation the other callers are waiting for
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
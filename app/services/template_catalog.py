@@ -0,0 +1,261 @@
+import asyncio
+import difflib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.config import Config
+from app.services.single_flight import SingleFlight
+from app.utils import fetch_meme_templates
+
+logger = logging.getLogger(__name__)
+
+# names LLMs commonly use for well-known templates that differ from the memegen.link name -> template id
+COMMON_ALIASES = {
+    "drake hotline bling": "drake",
+    "drake meme": "drake",
+    "drake yes no": "drake",
+    "distracted boyfriend": "db",
+    "expanding brain": "gb",
+    "galaxy brain": "gb",
+    "change my mind": "cmm",
+    "two buttons": "ds",
+    "daily struggle": "ds",
+    "is this a pigeon": "pigeon",
+    "this is fine": "fine",
+    "surprised pikachu": "pikachu",
+    "one does not simply": "mordor",
+    "success kid": "success",
+    "woman yelling at cat": "woman-cat",
+    "mocking spongebob": "spongebob",
+    "roll safe": "rollsafe",
+    "hide the pain harold": "harold",
+    "left exit 12 off ramp": "exit",
+    "gru's plan": "gru",
+    "grus plan": "gru",
+    "buff doge vs cheems": "cheems",
+    "always has been": "astronaut",
+    "disaster girl": "disastergirl",
+    "ancient aliens": "aag",
+    "batman slapping robin": "slap",
+    "uno draw 25": "uno",
+    "tuxedo winnie the pooh": "pooh",
+    "spider-man pointing at spider-man": "spiderman",
+    "they're the same picture": "same",
+    "grumpy cat": "grumpycat",
+}
+
+# fuzzy lookups are remembered, LLMs reuse the same spellings over and over
+FUZZY_CACHE_SIZE = 4096
+# a failed load is retried after 5s, doubling up to 5 minutes
+LOAD_RETRY_BASE = 5
+LOAD_RETRY_CAP = 300
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase ASCII words, so "Gru’s Plan!" and "grus plan" share one key"""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    name = re.sub(r"\(.*?\)", " ", name)
+    name = re.sub(r"['’]", "", name)
+    name = re.sub(r"[^a-z0-9]+", " ", name)
+    words = name.split()
+    for filler in ("meme", "template"):
+        if len(words) > 1 and words[-1] == filler:
+            words = words[:-1]
+    return " ".join(words)
+
+
+def sorted_words(key: str) -> str:
+    return " ".join(sorted(key.split()))
+
+
+class SingletonMeta(type):
+    _instances = {}
+
+    def __call__(cls, config: Config, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super().__call__(config, *args, **kwargs)
+        return cls._instances[cls]
+
+
+class TemplateCatalog(metaclass=SingletonMeta):
+    """The memegen.link template catalog, loaded once and refreshed in the background.
+
+    Resolves the template name a meme concept asks for through an exact name/id/alias index, unambiguous keywords
+    and a fuzzy match, so the vector search only runs for names it does not know.
+    """
+
+    def __init__(self, config: Config):
+        self.refresh_interval = config.template_catalog_refresh
+        self.fuzzy_cutoff = config.template_fuzzy_cutoff
+        self.templates: Dict[str, Dict] = {}
+        self.names: Dict[str, str] = {}
+        self.keywords: Dict[str, str] = {}
+        self._fuzzy: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # warmup loads from a worker thread, the refresh loop and requests through the event loop
+        self._load_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self.load_failures = 0
+        self._retry_at = 0.0
+        self.refresh_task: Optional[asyncio.Task] = None
+        self._loads = SingleFlight()
+        self.counters = {"exact": 0, "keyword": 0, "fuzzy": 0, "unmatched": 0, "texts_fitted": 0, "rejected": 0}
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def load(self, refresh: bool = False) -> int:
+        """(Re)build the index, a failed download keeps the catalog that is already loaded and is retried with backoff"""
+        with self._load_lock:
+            # someone else loaded it while we waited
+            if not refresh and self.loaded:
+                return len(self.templates)
+            return self._load(refresh)
+
+    def _load(self, refresh: bool) -> int:
+        templates = [template for template in fetch_meme_templates(refresh=refresh) if template.get("id")]
+        if not templates:
+            delay = min(LOAD_RETRY_CAP, LOAD_RETRY_BASE * 2 ** self.load_failures)
+            self.load_failures += 1
+            self._retry_at = time.monotonic() + delay
+            if self.loaded:
+                logger.warning(f"Template catalog refresh failed, keeping {len(self.templates)} templates")
+            else:
+                logger.warning(
+                    f"Template catalog could not be loaded, retrying in {delay}s; "
+                    f"template names are matched by vector search until then"
+                )
+            return len(self.templates)
+
+        by_id = {template["id"]: template for template in templates}
+        names: Dict[str, str] = {}
+        keyword_ids: Dict[str, set] = {}
+        for template_id, template in by_id.items():
+            for key in (normalize_name(template.get("name", "")), normalize_name(template_id)):
+                if key:
+                    names.setdefault(key, template_id)
+                    names.setdefault(sorted_words(key), template_id)
+            for keyword in template.get("keywords") or []:
+                keyword_ids.setdefault(normalize_name(keyword), set()).add(template_id)
+        for alias, template_id in COMMON_ALIASES.items():
+            if template_id in by_id:
+                names.setdefault(normalize_name(alias), template_id)
+                names.setdefault(sorted_words(normalize_name(alias)), template_id)
+        # a keyword only identifies a template when no other template uses it
+        keywords = {key: next(iter(ids)) for key, ids in keyword_ids.items() if key and len(ids) == 1}
+
+        with self._lock:
+            self.templates, self.names, self.keywords = by_id, names, keywords
+            self._fuzzy.clear()
+            self.loaded_at = time.time()
+            self.load_failures = 0
+        logger.info(f"Loaded template catalog with {len(by_id)} templates and {len(names)} names")
+        return len(by_id)
+
+    async def ensure_loaded(self):
+        if not self.loaded and time.monotonic() >= self._retry_at:
+            await self._loads.do("load", lambda: asyncio.to_thread(self.load))
+
+    def get(self, template_id: str) -> Optional[Dict]:
+        return self.templates.get(template_id)
+
+    def match(self, template_name: str, record: bool = True) -> Optional[Tuple[Dict, str]]:
+        """Template a concept names, with how it was found: exact, keyword or fuzzy"""
+        key = normalize_name(template_name or "")
+        if not key:
+            return None
+        with self._lock:
+            templates, names, keywords = self.templates, self.names, self.keywords
+        template_id = names.get(key) or names.get(sorted_words(key))
+        how = "exact"
+        if template_id is None and key in keywords:
+            template_id, how = keywords[key], "keyword"
+        if template_id is None:
+            template_id, how = self._fuzzy_match(key, names), "fuzzy"
+        if template_id is None or template_id not in templates:
+            how = "unmatched"
+        if record:
+            self.counters[how] += 1
+        if how == "unmatched":
+            return None
+        return templates[template_id], how
+
+    def _fuzzy_match(self, key: str, names: Dict[str, str]) -> Optional[str]:
+        with self._lock:
+            if key in self._fuzzy:
+                self._fuzzy.move_to_end(key)
+                return self._fuzzy[key]
+        close = difflib.get_close_matches(key, names.keys(), n=1, cutoff=self.fuzzy_cutoff)
+        template_id = names[close[0]] if close else None
+        with self._lock:
+            self._fuzzy[key] = template_id
+            while len(self._fuzzy) > FUZZY_CACHE_SIZE:
+                self._fuzzy.popitem(last=False)
+        return template_id
+
+    def lines(self, template_id: str) -> Optional[int]:
+        template = self.templates.get(template_id)
+        lines = template.get("lines") if template else None
+        return lines if isinstance(lines, int) and lines > 0 else None
+
+    def fit_texts(self, template_id: str, texts: List[str]) -> Optional[List[str]]:
+        """Texts shaped to the template's text slots, or None when there is nothing worth rendering.
+
+        Surplus texts are joined into the last slot instead of being silently dropped, missing ones are left empty.
+        """
+        texts = [text.strip() for text in texts]
+        if not any(texts):
+            self.counters["rejected"] += 1
+            return None
+        lines = self.lines(template_id)
+        if lines is None or len(texts) == lines:
+            return texts
+        self.counters["texts_fitted"] += 1
+        if len(texts) > lines:
+            return texts[:lines - 1] + [" ".join(text for text in texts[lines - 1:] if text)]
+        return texts + [""] * (lines - len(texts))
+
+    def start(self):
+        if self.refresh_task is None and self.refresh_interval > 0:
+            self.refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self.refresh_task:
+            self.refresh_task.cancel()
+            await asyncio.gather(self.refresh_task, return_exceptions=True)
+            self.refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            if not self.loaded:
+                # the first load reads the cached templates.json through the same single flight and backoff as
+                # requests, warmup is usually doing it right now
+                await asyncio.sleep(max(self._retry_at - time.monotonic(), 1))
+                try:
+                    await self.ensure_loaded()
+                except Exception as e:
+                    logger.warning(f"Template catalog load failed: {str(e)}")
+                continue
+            # re-download only once a full interval has passed since the catalog was loaded, failed refreshes back off
+            await asyncio.sleep(max(
+                self.loaded_at + self.refresh_interval - time.time(), self._retry_at - time.monotonic(), 1
+            ))
+            try:
+                await self._loads.do("refresh", lambda: asyncio.to_thread(self.load, True))
+            except Exception as e:
+                logger.warning(f"Template catalog refresh failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "templates": len(self.templates),
+            "names": len(self.names),
+            "loaded_at": self.loaded_at,
+            "load_failures": self.load_failures,
+        }
@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.config import Config
+from app.utils import embedding_model_id, fetch_meme_templates, get_encoding_model, write_atomic
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+# which embedding backend produced the vectors, indexes written before it existed came from sentence-transformers
+INFO_FILE = "index.json"
+
+
+class SingletonMeta(type):
+    _instances = {}
+
+    def __call__(cls, config: Config, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super().__call__(config, *args, **kwargs)
+        return cls._instances[cls]
+
+
+def template_text(template: Dict) -> str:
+    """Text that represents a template in the embedding space"""
+    parts = [template.get("name", "")]
+    parts.extend(template.get("keywords") or [])
+    example = template.get("example") or {}
+    parts.extend(text for text in example.get("text", []) if text)
+    return " ".join(str(part) for part in parts if part)
+
+
+@contextmanager
+def build_lock(index_dir: Path) -> Iterator[None]:
+    """Serializes index builds across workers and the build script"""
+    index_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_dir.parent / f"{index_dir.name}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _write_info(index_dir: Path, info: Dict):
+    write_atomic(index_dir / INFO_FILE, json.dumps(info).encode())
+
+
+def build_template_index(index_dir: Path, refresh: bool = False) -> int:
+    """Embed the template catalog and write it to disk as a normalized float32 matrix"""
+    templates = [template for template in fetch_meme_templates(refresh=refresh) if template.get("id")]
+    if not templates:
+        raise RuntimeError("Template catalog is empty, nothing to index")
+
+    vectors = get_encoding_model().encode(
+        [template_text(template) for template in templates],
+        batch_size=64,
+        convert_to_numpy=True,
+    ).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+    metadata = [{"id": template["id"], "name": template.get("name", "")} for template in templates]
+
+    # write next to the live files and swap them in, readers never see a partial index
+    index_dir.mkdir(parents=True, exist_ok=True)
+    info = {"embedding": embedding_model_id(), "templates": len(metadata)}
+    # marked unfinished until both files are in place, a crash in between leaves an index that is rebuilt, never one
+    # whose vectors are labelled with the wrong backend
+    _write_info(index_dir, {**info, "complete": False})
+    vectors_tmp = index_dir / f"{VECTORS_FILE}.tmp"
+    metadata_tmp = index_dir / f"{METADATA_FILE}.tmp"
+    with open(vectors_tmp, "wb") as file:
+        np.save(file, vectors)
+    with open(metadata_tmp, "w") as file:
+        json.dump(metadata, file)
+    os.replace(vectors_tmp, index_dir / VECTORS_FILE)
+    os.replace(metadata_tmp, index_dir / METADATA_FILE)
+    _write_info(index_dir, {**info, "complete": True})
+
+    logger.info(f"Indexed {len(metadata)} meme templates into {index_dir}")
+    return len(metadata)
+
+
+class LocalTemplateIndex(metaclass=SingletonMeta):
+    """In-process cosine similarity search over the meme template catalog"""
+
+    def __init__(self, config: Config):
+        self.index_dir = Path(config.template_index_dir)
+        self.vectors: Optional[np.ndarray] = None
+        self.metadata: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def load(self, build: bool = False):
+        """Memory-map the index from disk. A missing or stale index is built first with `build` (warmup), otherwise
+        loading fails, building on the request path would stall it for the whole catalog"""
+        with self._lock:
+            if self.vectors is not None:
+                return
+            problem = self._problem()
+            if problem and not build:
+                raise RuntimeError(f"{problem}, build it with `python -m app.services.template_index`")
+            if problem:
+                with build_lock(self.index_dir):
+                    # another worker may have built it while we waited for the lock
+                    problem = self._problem()
+                    if problem:
+                        logger.warning(f"{problem}, building it now")
+                        build_template_index(self.index_dir)
+            self.vectors = np.load(self.index_dir / VECTORS_FILE, mmap_mode="r")
+            with open(self.index_dir / METADATA_FILE, "r") as file:
+                self.metadata = json.load(file)
+            logger.info(f"Loaded template index with {len(self.metadata)} templates")
+
+    def _built_with(self) -> Optional[str]:
+        """Embedding the index was built with, None for an unfinished build"""
+        info_path = self.index_dir / INFO_FILE
+        if not info_path.exists():
+            return "sentence-transformers:all-MiniLM-L6-v2"
+        info = json.loads(info_path.read_text())
+        if not info.get("complete", True):
+            return None
+        return info.get("embedding", "")
+
+    def _problem(self) -> Optional[str]:
+        """Why the index on disk cannot be used, None when it can"""
+        if not (self.index_dir / VECTORS_FILE).exists():
+            return f"No template index found in {self.index_dir}"
+        built_with = self._built_with()
+        if built_with is None:
+            return f"Template index in {self.index_dir} is an unfinished build"
+        if built_with != embedding_model_id():
+            return f"Template index in {self.index_dir} was built with {built_with}, not {embedding_model_id()}"
+        return None
+
+    def query(self, query_vector, top_k=1, include_metadata=True):
+        """Same call and response shape as PineconeClient.query"""
+        if self.vectors is None:
+            self.load()
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != self.vectors.shape[1]:
+            logger.warning("Query vector is empty or does not match the index dimension.")
+            return {"matches": []}
+
+        scores = self.vectors @ (query / norm)
+        k = min(top_k, scores.shape[0])
+        if k <= 0:
+            return {"matches": []}
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for position in top:
+            match = {"id": self.metadata[position]["id"], "score": float(scores[position])}
+            if include_metadata:
+                match["metadata"] = {"name": self.metadata[position]["name"]}
+            matches.append(match)
+        return {"matches": matches}
+
+    async def aquery(self, query_vector, top_k=1, include_metadata=True):
+        return await asyncio.to_thread(self.query, query_vector, top_k, include_metadata)
+
+
+def get_template_index(config: Config):
+    """Return the template search backend selected in the configuration"""
+    if config.template_index_backend == "local":
+        return LocalTemplateIndex(config)
+    elif config.template_index_backend == "pinecone":
+        # optional backend, only needs the pinecone package when selected
+        from app.services.pinecone import PineconeClient
+        return PineconeClient(config)
+    else:
+        raise ValueError(f"Invalid template index backend: {config.template_index_backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local meme template index")
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="re-download the template catalog from memegen.link instead of using templates.json",
+    )
+    args = parser.parse_args()
+    index_dir = Path(Config().template_index_dir)
+    with build_lock(index_dir):
+        build_template_index(index_dir, refresh=args.refresh)
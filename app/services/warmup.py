@@ -0,0 +1,43 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupTracker:
+    """Runs the expensive initialization steps after startup and reports their status"""
+
+    def __init__(self):
+        self.steps: Dict[str, Callable] = {}
+        self.status: Dict[str, Dict] = {}
+
+    def register(self, name: str, step: Callable):
+        self.steps[name] = step
+        self.status[name] = {"ready": False, "error": None, "seconds": None}
+
+    async def run(self):
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self.steps.items()))
+
+    async def _run_step(self, name: str, step: Callable):
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(step):
+                await step()
+            else:
+                # warm-up steps load models and make blocking network calls
+                await asyncio.to_thread(step)
+            self.status[name].update(ready=True, error=None)
+            logger.info(f"Warm-up step {name} finished in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            # keep serving, the component is initialized again on first use
+            self.status[name].update(ready=False, error=str(e))
+            logger.error(f"Warm-up step {name} failed: {str(e)}")
+        finally:
+            self.status[name]["seconds"] = round(time.perf_counter() - start, 3)
+
+    @property
+    def ready(self) -> bool:
+        return all(step["ready"] for step in self.status.values())
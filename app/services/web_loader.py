@@ -0,0 +1,90 @@
+import asyncio
+import codecs
+import logging
+
+from app.config import Config
+from app.services.content_cache import WebsiteContentCache
+from app.services.content_extractor import ContentExtractor
+from app.services.http_pool import HttpClientPool
+from app.services.metrics import record_cache, timed
+from app.services.single_flight import SingleFlight
+from app.utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# parse in chunks of this size, off the event loop
+PARSE_CHUNK_BYTES = 64 * 1024
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; memgen-business-analyzer/1.0)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+}
+
+
+class WebsiteLoader:
+    """Loads the text of a web page, served from the disk cache whenever possible"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.cache = WebsiteContentCache(config)
+        self.http_client = HttpClientPool(config).get(
+            "web", timeout=20, follow_redirects=True, headers=DEFAULT_HEADERS
+        )
+        self.fetches = SingleFlight("page_fetch")
+
+    async def load(self, url: str) -> str:
+        """Concurrent loads of the same page share one cache lookup and download"""
+        return await self.fetches.do(normalize_url(url), lambda: self._load(url))
+
+    async def _load(self, url: str) -> str:
+        entry, fresh = await asyncio.to_thread(self.cache.lookup, url)
+        record_cache("website", bool(entry and fresh))
+        if entry and fresh:
+            logger.info(f"Website content cache hit for: {url}")
+            return entry["content"]
+
+        headers = self.cache.validators(entry) if entry else {}
+        logger.info(f"Loading website content from: {url}")
+        with timed("page_fetch"):
+            async with self.http_client.stream("GET", url, headers=headers) as response:
+                if entry and response.status_code == 304:
+                    logger.info(f"Website content not modified, reusing cached copy for: {url}")
+                    await asyncio.to_thread(self.cache.revalidated, url, entry)
+                    return entry["content"]
+                response.raise_for_status()
+                content = await self._extract(response)
+
+        await asyncio.to_thread(
+            self.cache.put,
+            url,
+            content,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        return content
+
+    async def _extract(self, response) -> str:
+        """Parse the body while it downloads, stop at the byte cap or once the token budget is filled"""
+        extractor = ContentExtractor(self.config.web_extract_token_budget)
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        received = 0
+        buffer = []
+        buffered = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            buffer.append(chunk)
+            buffered += len(chunk)
+            capped = received >= self.config.web_max_bytes
+            if buffered >= PARSE_CHUNK_BYTES or capped:
+                await asyncio.to_thread(extractor.feed, decoder.decode(b"".join(buffer)))
+                buffer, buffered = [], 0
+            if extractor.done or capped:
+                break
+        if buffer:
+            await asyncio.to_thread(extractor.feed, decoder.decode(b"".join(buffer), final=True))
+        extractor.close()
+        logger.info(
+            f"Extracted ~{extractor.tokens} tokens in {len(extractor.blocks)} blocks "
+            f"from {received} bytes of {response.url}"
+        )
+        return extractor.text()
@@ -1,42 +1,180 @@
+import hashlib
 import json
 import os
+import random
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import requests
 import logging
-from typing import Dict, Optional
-from sentence_transformers import SentenceTransformer
+from pathlib import Path
+from typing import Dict, List, Optional, Union
 
 logger = logging.getLogger(__name__)
-encoding_model = SentenceTransformer('all-MiniLM-L6-v2')
 
-def fetch_meme_templates():
+_encoding_model = None
+_encoding_model_lock = threading.Lock()
+
+# sentence-transformers (PyTorch) or onnx (int8 quantized export, see scripts/export_onnx_embedding.py)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_ONNX_DIR = os.environ.get("EMBEDDING_ONNX_DIR", "models/all-MiniLM-L6-v2-onnx-int8")
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", 0)) # 0 lets the runtime decide
+# off loads the model in every worker; spawn shares one sidecar per host, started by the first worker that needs it;
+# connect only uses a sidecar started with `python -m app.services.embedding_service`
+EMBEDDING_SERVICE = os.environ.get("EMBEDDING_SERVICE", "off")
+EMBEDDING_SERVICE_SOCKET = os.environ.get("EMBEDDING_SERVICE_SOCKET", "cache/embedding.sock")
+EMBEDDING_SERVICE_MAX_BATCH = int(os.environ.get("EMBEDDING_SERVICE_MAX_BATCH", 64))
+EMBEDDING_SERVICE_MAX_WAIT_MS = float(os.environ.get("EMBEDDING_SERVICE_MAX_WAIT_MS", 5))
+EMBEDDING_SERVICE_IDLE_TIMEOUT = float(os.environ.get("EMBEDDING_SERVICE_IDLE_TIMEOUT", 900)) # seconds, spawned sidecars only
+
+TEMPLATES_FILE = "templates.json"
+TEMPLATES_TIMEOUT = 30 # seconds
+
+# LRU of normalized text hash -> embedding vector
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 4096))
+_embedding_cache: "OrderedDict[str, object]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Exponential backoff with full jitter, in seconds, so retries from concurrent requests spread out"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL so trivially different spellings share cache entries"""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    # the fragment never reaches the server
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+def get_encoding_model():
+    """Load the sentence embedding model on first use, importing torch is expensive"""
+    global _encoding_model
+    if _encoding_model is None:
+        with _encoding_model_lock:
+            if _encoding_model is None:
+                if EMBEDDING_SERVICE in ("spawn", "connect"):
+                    from app.services.embedding_service import connect
+                    _encoding_model = connect(
+                        EMBEDDING_SERVICE_SOCKET, EMBEDDING_SERVICE == "spawn", EMBEDDING_SERVICE_IDLE_TIMEOUT
+                    )
+                    logger.info(f"Using the embedding service on {EMBEDDING_SERVICE_SOCKET}")
+                else:
+                    from app.services.embedding_backends import load_encoder
+                    _encoding_model = load_encoder(EMBEDDING_BACKEND, EMBEDDING_ONNX_DIR, EMBEDDING_THREADS)
+                    logger.info(f"Loaded sentence embedding model ({EMBEDDING_BACKEND} backend)")
+    return _encoding_model
+
+def embedding_stats() -> Dict:
+    """Embedding cache counters, plus the sidecar's batching counters when it is in use"""
+    with _embedding_cache_lock:
+        result = {"backend": EMBEDDING_BACKEND, "service": EMBEDDING_SERVICE, "cached": len(_embedding_cache)}
+    # never loads the model just to report on it
+    if _encoding_model is not None and hasattr(_encoding_model, "stats"):
+        try:
+            result["service_stats"] = _encoding_model.stats()
+        except OSError as e:
+            result["service_stats"] = {"error": str(e)}
+    return result
+
+def embedding_model_id() -> str:
+    """Identifies the vectors the configured backend produces, indexes built with another one must be rebuilt"""
+    if EMBEDDING_BACKEND == "onnx":
+        return f"onnx:{os.path.basename(os.path.normpath(EMBEDDING_ONNX_DIR))}"
+    return f"{EMBEDDING_BACKEND}:all-MiniLM-L6-v2"
+
+def write_atomic(path: Union[str, Path], data: bytes):
+    """Write through a temp file of our own and rename it into place, readers never see a partial file and
+    concurrent writers of the same path do not trip over each other"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def fetch_meme_templates(refresh: bool = False):
     try:
         # Check if the file exists and is not empty
-        if os.path.exists("templates.json") and os.path.getsize("templates.json") > 0:
-            with open("templates.json", "r") as file:
-                return json.load(file)
-        response = requests.get("https://api.memegen.link/templates")
+        if not refresh and os.path.exists(TEMPLATES_FILE) and os.path.getsize(TEMPLATES_FILE) > 0:
+            try:
+                with open(TEMPLATES_FILE, "r") as file:
+                    return json.load(file)
+            except ValueError:
+                logger.warning(f"{TEMPLATES_FILE} is corrupt, downloading the templates again")
+        base_url = os.environ.get("MEMEGEN_BASE_URL", "https://api.memegen.link").rstrip("/")
+        response = requests.get(f"{base_url}/templates", timeout=TEMPLATES_TIMEOUT)
         if response.status_code == 200:
-            # write the response to a file
-            with open("templates.json", "w") as file:
-                file.write(response.text)
-            return response.json()
+            templates = response.json()
+            # other workers may be reading the file while this one refreshes it
+            write_atomic(TEMPLATES_FILE, response.content)
+            return templates
         return []
     except Exception as e:
         print(f"Error fetching templates: {e}")
         return []
 
-def create_embeddings(content: Dict) -> Optional[list]:
+def _normalize_text(content: Dict) -> str:
     content_text = " ".join(str(value) for value in content.values() if value)
-    if not content_text.strip():
-        logger.warning("Content text is empty.")
-        return None
-    try:
-        query_embedding = encoding_model.encode(content_text, convert_to_numpy=True).tolist()
-        if not query_embedding or not isinstance(query_embedding, list):
-            logger.error("Embedding generation failed.")
-            return None   
-        return query_embedding
-    except Exception as e:
-        logger.exception(f"Failed to generate embedding: {e}")
+    # all-MiniLM-L6-v2 is uncased, so case and whitespace do not change the embedding
+    return " ".join(content_text.split()).lower()
+
+
+def _cache_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def create_embeddings_batch(contents: List[Dict]) -> List[Optional[list]]:
+    """Embed many contents with a single encode() call, reusing cached vectors"""
+    texts = [_normalize_text(content) for content in contents]
+    embeddings: List[Optional[list]] = [None] * len(texts)
+    missing: Dict[str, str] = {}
+
+    with _embedding_cache_lock:
+        for position, text in enumerate(texts):
+            if not text:
+                logger.warning("Content text is empty.")
+                continue
+            key = _cache_key(text)
+            if key in _embedding_cache:
+                _embedding_cache.move_to_end(key)
+                embeddings[position] = _embedding_cache[key].tolist()
+            else:
+                missing[key] = text
+
+    if missing:
+        try:
+            vectors = get_encoding_model().encode(list(missing.values()), convert_to_numpy=True)
+        except Exception as e:
+            logger.exception(f"Failed to generate embedding: {e}")
+            return embeddings
+        computed = dict(zip(missing.keys(), vectors))
+        with _embedding_cache_lock:
+            for key, vector in computed.items():
+                _embedding_cache[key] = vector
+                _embedding_cache.move_to_end(key)
+            while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+        for position, text in enumerate(texts):
+            if embeddings[position] is None and text:
+                embeddings[position] = computed[_cache_key(text)].tolist()
+
+    return embeddings
+
+
+def create_embeddings(content: Dict) -> Optional[list]:
+    query_embedding = create_embeddings_batch([content])[0]
+    if not query_embedding:
+        logger.error("Embedding generation failed.")
         return None
-    
\ No newline at end of file
+    return query_embedding
@@ -0,0 +1,119 @@
+"""Compare the embedding backends: model load time, memory, single-sentence latency and batch throughput.
+
+Every backend is measured in a fresh interpreter so imports and model weights do not leak between them.
+
+Usage:
+    python -m benchmarks.embeddings [--backends sentence-transformers,onnx] [--iterations N] [--batch-size N]
+                                    [--threads N] [--output results.json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+EVAL_SET = ROOT / "scripts" / "embedding_eval_set.json"
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+def measure(backend: str, onnx_dir: str, threads: int, iterations: int, batch_size: int) -> Dict:
+    """Runs in the child process"""
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.run import percentile
+    from app.services.embedding_backends import load_encoder
+    from app.utils import _normalize_text
+
+    queries = [_normalize_text(concept) for concept in json.loads(EVAL_SET.read_text())]
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    encoder = load_encoder(backend, onnx_dir, threads)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+    encoder.encode(queries[:4])
+
+    # one sentence per call, which is what create_embeddings does on the request path
+    latencies: List[float] = []
+    for iteration in range(iterations):
+        query = queries[iteration % len(queries)]
+        start = time.perf_counter()
+        encoder.encode([query])
+        latencies.append(time.perf_counter() - start)
+
+    batch = (queries * (batch_size * 4 // len(queries) + 1))[:batch_size * 4]
+    start = time.perf_counter()
+    encoder.encode(batch, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "rss_mb": {"before_load": rss_before, "after_load": rss_loaded, "end": rss_mb()},
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "single_latency_ms": {
+            name: round(percentile(latencies, percent) * 1000, 2) for name, percent in (("p50", 50), ("p95", 95), ("p99", 99))
+        },
+        "batch_sentences_per_second": round(len(batch) / batch_seconds, 1),
+    }
+
+
+def run_child(args, backend: str) -> Dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.embeddings", "--child", backend, "--onnx-dir", args.onnx_dir,
+         "--threads", str(args.threads), "--iterations", str(args.iterations), "--batch-size", str(args.batch_size)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return {"backend": backend, "error": result.stderr.strip().splitlines()[-1] if result.stderr else "failed"}
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="sentence-transformers,onnx")
+    parser.add_argument("--onnx-dir", default=os.environ.get("EMBEDDING_ONNX_DIR", "models/all-MiniLM-L6-v2-onnx-int8"))
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads, 0 lets it decide")
+    parser.add_argument("--iterations", type=int, default=200, help="single-sentence encode() calls")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.onnx_dir, args.threads, args.iterations, args.batch_size)))
+        return
+
+    results = [run_child(args, backend.strip()) for backend in args.backends.split(",") if backend.strip()]
+    text = json.dumps({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+    measured = [result for result in results if "error" not in result]
+    if len(measured) == 2:
+        baseline, current = measured
+        for name, before, now in (
+            ("rss_mb.after_load", baseline["rss_mb"]["after_load"], current["rss_mb"]["after_load"]),
+            ("single_latency_ms.p50", baseline["single_latency_ms"]["p50"], current["single_latency_ms"]["p50"]),
+            ("batch_sentences_per_second", baseline["batch_sentences_per_second"], current["batch_sentences_per_second"]),
+        ):
+            print(f"{name}: {baseline['backend']} {before} -> {current['backend']} {now} "
+                  f"({(now - before) / before * 100:+.1f}%)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Local stand-ins for every external service the app talks to, so benchmarks run offline and deterministically."""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+import numpy as np
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from PIL import Image
+
+from app.llm_providers.base import BaseLLMProvider
+
+EMBEDDING_DIMENSIONS = 384  # same as all-MiniLM-L6-v2
+NUM_TEMPLATES = 60
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class FakeChatModel(Runnable):
+    """Answers the business analyzer and campaign prompts with canned JSON derived from the prompt"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def _answer(self, input: Any) -> AIMessage:
+        prompt = input.to_string() if hasattr(input, "to_string") else str(input)
+        seed = _digest(prompt)
+        requested = re.search(r"Create (\d+) VIRAL-WORTHY", prompt)
+        if requested:
+            memes = [
+                {
+                    "template_name": f"Template {(seed + i) % NUM_TEMPLATES}",
+                    "texts": [f"when the deploy {seed % 997} works", f"first try number {i}"],
+                    "hashtags": ["benchmark", "memes"],
+                    "visual_description": "a person looking pleased with themselves",
+                }
+                for i in range(int(requested.group(1)))
+            ]
+            return AIMessage(content=json.dumps({"memes": memes}))
+        return AIMessage(content=json.dumps({
+            "name": f"Business {seed % 100_000}",
+            "industry": "Software",
+            "core_offerings": ["Hosted widgets", "Widget analytics"],
+            "value_propositions": ["Fast", "Cheap"],
+            "target_audience": ["Developers"],
+            "brand_tone": "casual",
+        }))
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AIMessage:
+        time.sleep(self.latency)
+        return self._answer(input)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AIMessage:
+        await asyncio.sleep(self.latency)
+        return self._answer(input)
+
+
+class FakeLLMProvider(BaseLLMProvider):
+    """Deterministic provider with a fixed latency per call"""
+    latency = 0.2
+
+    def create_client(self, temperature: float = 0.7, **kwargs) -> FakeChatModel:
+        return FakeChatModel(self.latency)
+
+    def get_provider_name(self) -> str:
+        return "fake"
+
+    def get_model_name(self) -> str:
+        return "fake-model"
+
+
+class FakeEncoder:
+    """Stands in for SentenceTransformer, hashes words into a normalized bag-of-words vector"""
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, _digest(word) % EMBEDDING_DIMENSIONS] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        return vectors[0] if single else vectors
+
+
+class _StoredObject:
+    def __init__(self, object_name: str, size: int, content_type: str):
+        self.object_name = object_name
+        self.size = size
+        self.content_type = content_type
+
+
+class InMemoryMinio:
+    """Implements the part of the minio.Minio API the app uses, objects live in a dict"""
+
+    def __init__(self, endpoint: str = "", access_key: str = "", secret_key: str = "", secure: bool = False, **kwargs):
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+        self.content_types: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return bucket_name in self.buckets
+
+    def make_bucket(self, bucket_name: str):
+        self.buckets.setdefault(bucket_name, {})
+
+    def put_object(self, bucket_name: str, object_name: str, data, length: int, content_type: str = "application/octet-stream", **kwargs):
+        with self.lock:
+            self.buckets[bucket_name][object_name] = data.read(length) if length >= 0 else data.read()
+            self.content_types[f"{bucket_name}/{object_name}"] = content_type
+
+    def fput_object(self, bucket_name: str, object_name: str, file_path: str, content_type: str = "application/octet-stream", **kwargs):
+        with open(file_path, "rb") as file:
+            self.put_object(bucket_name, object_name, file, -1, content_type)
+
+    def stat_object(self, bucket_name: str, object_name: str, **kwargs) -> _StoredObject:
+        try:
+            data = self.buckets[bucket_name][object_name]
+        except KeyError:
+            raise FileNotFoundError(f"{bucket_name}/{object_name}")
+        return _StoredObject(object_name, len(data), self.content_types.get(f"{bucket_name}/{object_name}", ""))
+
+    def get_object(self, bucket_name: str, object_name: str, **kwargs) -> BytesIO:
+        self.stat_object(bucket_name, object_name)
+        return BytesIO(self.buckets[bucket_name][object_name])
+
+    def fget_object(self, bucket_name: str, object_name: str, file_path: str, **kwargs):
+        with open(file_path, "wb") as file:
+            file.write(self.get_object(bucket_name, object_name).read())
+
+    def remove_object(self, bucket_name: str, object_name: str, **kwargs):
+        with self.lock:
+            self.buckets.get(bucket_name, {}).pop(object_name, None)
+
+    def list_objects(self, bucket_name: str, **kwargs) -> List[_StoredObject]:
+        return [self.stat_object(bucket_name, name) for name in list(self.buckets.get(bucket_name, {}))]
+
+    def get_presigned_url(self, method: str, bucket_name: str, object_name: str, **kwargs) -> str:
+        return f"http://minio.invalid/{bucket_name}/{object_name}?X-Amz-Signature=fake"
+
+    def presigned_get_object(self, bucket_name: str, object_name: str, **kwargs) -> str:
+        return self.get_presigned_url("GET", bucket_name, object_name)
+
+
+def fake_templates(base_url: str) -> List[Dict]:
+    return [
+        {
+            "id": f"t{i:02d}",
+            "name": f"Template {i}",
+            "lines": 2,
+            "keywords": [f"keyword{i}", f"topic{i % 7}"],
+            "blank": f"{base_url}/blank/t{i:02d}.png",
+            "example": {"text": [f"top text {i}", f"bottom text {i}"]},
+        }
+        for i in range(NUM_TEMPLATES)
+    ]
+
+
+def fake_site(index: int) -> str:
+    paragraphs = "".join(
+        f"<p>Business {index} helps teams ship widget number {i} faster, with analytics, alerts and friendly support.</p>"
+        for i in range(40)
+    )
+    return (
+        f"<html><head><title>Business {index}</title>"
+        f'<meta name="description" content="Widgets for team {index}"></head>'
+        f"<body><nav><a href='/'>Home</a></nav><main><h1>Business {index}</h1>{paragraphs}</main></body></html>"
+    )
+
+
+def _image(pillow_format: str, size=(600, 600), color=(90, 120, 200)) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, format=pillow_format)
+    return output.getvalue()
+
+
+class FakeServices:
+    """One local HTTP server standing in for the memegen.link API, template backgrounds and customer websites.
+
+    Routes:
+        /templates             memegen template catalog
+        /images/<id>/<...>.png rendered meme, after `render_latency`
+        /blank/<id>.png        blank template background
+        /site/<n>              a business website, after `site_latency`
+    """
+
+    def __init__(self, render_latency: float = 0.05, site_latency: float = 0.02, host: str = "127.0.0.1"):
+        self.render_latency = render_latency
+        self.site_latency = site_latency
+        self.images = {extension: _image(pillow_format) for extension, pillow_format in
+                       {"png": "PNG", "webp": "WEBP", "jpg": "JPEG"}.items()}
+        self.requests = 0
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                services.requests += 1
+                path = unquote(self.path.split("?", 1)[0])
+                if path == "/templates":
+                    self._send(json.dumps(fake_templates(services.base_url)).encode(), "application/json")
+                elif path.startswith("/images/"):
+                    time.sleep(services.render_latency)
+                    extension = path.rsplit(".", 1)[-1]
+                    self._send(services.images.get(extension, services.images["png"]), f"image/{extension}")
+                elif path.startswith("/blank/"):
+                    self._send(services.images["png"], "image/png")
+                elif path.startswith("/site/"):
+                    time.sleep(services.site_latency)
+                    self._send(fake_site(_digest(path) % 100_000).encode(), "text/html; charset=utf-8")
+                else:
+                    self._send(b"not found", "text/plain", status=404)
+
+            def _send(self, body: bytes, content_type: str, status: int = 200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "FakeServices":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,288 @@
+"""Load-test `app.main:app` offline against local fakes and report throughput, latency percentiles and peak RSS as JSON.
+
+Usage:
+    python -m benchmarks.run [--requests N] [--concurrency N] [--num-memes N] [--generator memegen|pillow]
+                             [--format png|webp|jpg] [--endpoint campaign|bulk]
+                             [--llm-latency S] [--render-latency S] [--sites N]
+                             [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(samples: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, int(round(percent / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def install_fakes(args, services, workdir: Path):
+    """Point the app at the fakes, must run before app.main is imported"""
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "LLM_FALLBACK_PROVIDERS": "",
+        "MEME_GENERATOR": args.generator,
+        "MEMEGEN_BASE_URL": services.base_url,
+        "TEMPLATE_INDEX_BACKEND": "local",
+        "TEMPLATE_INDEX_DIR": str(workdir / "template_index"),
+        "TEMPLATE_IMAGE_DIR": str(workdir / "templates"),
+        "WEB_CACHE_DIR": str(workdir / "web"),
+        "PROFILE_CACHE_BACKEND": "memory",
+        "JOB_STORE_BACKEND": "memory",
+        "RATE_LIMIT": str(10 ** 9),
+        "RATE_LIMIT_MEMES": str(10 ** 9),
+        "RATE_LIMIT_BULK_MEMES": str(10 ** 9),
+        "BULK_MAX_CAMPAIGNS": str(10 ** 6),
+        "RATE_LIMIT_STORAGE_URI": f"sqlite:///{workdir / 'ratelimit.sqlite3'}",
+        "RATE_WINDOW": "second",
+    })
+    # templates.json and the memes directory are written to the working directory
+    os.chdir(workdir)
+
+    from benchmarks import fakes
+    import app.services.minio as minio
+    import app.utils as utils
+    from app.llm_providers.factory import LLMProviderFactory
+
+    fakes.FakeLLMProvider.latency = args.llm_latency
+    LLMProviderFactory._providers["fake"] = fakes.FakeLLMProvider
+    minio.Minio = fakes.InMemoryMinio
+    utils._encoding_model = fakes.FakeEncoder()
+
+
+class AppServer:
+    """Runs uvicorn on its own thread and event loop, the load generator keeps the main loop"""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def start(self, client: httpx.AsyncClient, timeout: float = 60):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{self.base_url}/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        raise RuntimeError("App did not become ready in time")
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def drive(args, base_url: str, site_url: str, client: httpx.AsyncClient) -> Dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    image_errors = 0
+
+    async def one(number: int):
+        nonlocal image_errors
+        url = f"{site_url}/site/{number % args.sites}"
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{base_url}/meme_campaign",
+                    params={"url": url, "num_memes": args.num_memes, "format": args.format},
+                )
+                status = str(response.status_code)
+                if response.status_code == 200:
+                    image_errors += sum(1 for error in response.json().get("errors", []) if error)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(number) for number in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    return report_latencies(args, elapsed, statuses, image_errors, latencies)
+
+
+async def drive_bulk(args, base_url: str, site_url: str, client: httpx.AsyncClient) -> Dict:
+    """All requests as a single /meme_campaign/bulk call, latency is the time until a website's manifest entry arrives"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    image_errors = 0
+    campaigns = [{"url": f"{site_url}/site/{number % args.sites}", "num_memes": args.num_memes}
+                 for number in range(args.requests)]
+
+    start = time.perf_counter()
+    async with client.stream(
+        "POST", f"{base_url}/meme_campaign/bulk", json={"campaigns": campaigns, "format": args.format}
+    ) as response:
+        if response.status_code != 200:
+            statuses[str(response.status_code)] = args.requests
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("type") != "campaign":
+                continue
+            latencies.append(time.perf_counter() - start)
+            status = "200" if entry["status"] == "completed" else entry["status"]
+            statuses[status] = statuses.get(status, 0) + 1
+            image_errors += sum(1 for error in entry.get("errors", []) if error)
+    elapsed = time.perf_counter() - start
+    return report_latencies(args, elapsed, statuses, image_errors, latencies)
+
+
+def report_latencies(args, elapsed: float, statuses: Dict[str, int], image_errors: int, latencies: List[float]) -> Dict:
+    ok = statuses.get("200", 0)
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "statuses": statuses,
+        "image_errors": image_errors,
+        "throughput_rps": round(ok / elapsed, 3) if elapsed else None,
+        "memes_per_second": round(ok * args.num_memes / elapsed, 3) if elapsed else None,
+        "latency_ms": {
+            name: round(value * 1000, 1) if value is not None else None
+            for name, value in {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies) if latencies else None,
+            }.items()
+        },
+    }
+
+
+async def run(args) -> Dict:
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.fakes import FakeServices
+
+    workdir = Path(tempfile.mkdtemp(prefix="memgen-bench-"))
+    services = FakeServices(render_latency=args.render_latency, site_latency=args.site_latency).start()
+    install_fakes(args, services, workdir)
+    from app.main import app
+
+    server = AppServer(app, free_port())
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        await server.start(client)
+        try:
+            # untimed requests warm up lazy imports, the template index and the connection pools
+            for number in range(min(args.warmup, args.requests)):
+                await client.post(
+                    f"{server.base_url}/meme_campaign",
+                    params={"url": f"{services.base_url}/site/warmup-{number}", "num_memes": 1},
+                )
+            driver = drive_bulk if args.endpoint == "bulk" else drive
+            results = await driver(args, server.base_url, services.base_url, client)
+            stats = (await client.get(f"{server.base_url}/stats")).json()
+        finally:
+            server.stop()
+            services.stop()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "params": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "num_memes": args.num_memes,
+            "generator": args.generator,
+            "format": args.format,
+            "endpoint": args.endpoint,
+            "sites": args.sites,
+            "llm_latency": args.llm_latency,
+            "render_latency": args.render_latency,
+            "site_latency": args.site_latency,
+        },
+        **results,
+        # ru_maxrss is in KiB on Linux, covers the app, the fakes and the load generator
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "app_stats": stats,
+    }
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    lines = []
+    metrics = [("throughput_rps", current.get("throughput_rps"), baseline.get("throughput_rps"))]
+    metrics += [
+        (f"latency_ms.{name}", current["latency_ms"].get(name), baseline.get("latency_ms", {}).get(name))
+        for name in ("p50", "p95", "p99")
+    ]
+    metrics.append(("peak_rss_mb", current.get("peak_rss_mb"), baseline.get("peak_rss_mb")))
+    for name, now, before in metrics:
+        if now is None or not before:
+            continue
+        lines.append(f"{name}: {before} -> {now} ({(now - before) / before * 100:+.1f}%)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--num-memes", type=int, default=3)
+    parser.add_argument("--generator", choices=["memegen", "pillow"], default="memegen")
+    parser.add_argument("--format", choices=["png", "webp", "jpg"], default="png")
+    parser.add_argument("--endpoint", choices=["campaign", "bulk"], default="campaign",
+                        help="one /meme_campaign request per website, or all websites in one /meme_campaign/bulk request")
+    parser.add_argument("--sites", type=int, default=None, help="distinct websites to cycle through, defaults to one per request")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--render-latency", type=float, default=0.05, help="seconds per fake memegen.link render")
+    parser.add_argument("--site-latency", type=float, default=0.02, help="seconds per fake website response")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests before the run")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--compare", help="JSON report of an earlier run to print the deltas against")
+    args = parser.parse_args()
+    args.sites = args.sites or args.requests
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        Path(output).write_text(text + "\n")
+    if baseline:
+        for line in compare(report, baseline):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Check that the ONNX int8 embedding backend picks the same top-1 meme templates as sentence-transformers.
+
+Both backends embed the template catalog (templates.json, downloaded when missing) and a fixed evaluation set of meme
+concepts, then every concept is matched to its nearest template. Fails when fewer top-1 matches agree than required.
+
+Usage:
+    python scripts/check_embedding_parity.py [--onnx-dir DIR] [--eval-set FILE] [--with-examples] [--min-agreement R]
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.services.embedding_backends import load_encoder  # noqa: E402
+from app.services.template_index import template_text  # noqa: E402
+from app.utils import _normalize_text, fetch_meme_templates  # noqa: E402
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def top1(encoder, templates, queries):
+    template_vectors = normalized(encoder.encode([template_text(template) for template in templates], batch_size=64))
+    query_vectors = normalized(encoder.encode(queries, batch_size=64))
+    scores = query_vectors @ template_vectors.T
+    return scores.argmax(axis=1), scores.max(axis=1), query_vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--onnx-dir", default=os.environ.get("EMBEDDING_ONNX_DIR", "models/all-MiniLM-L6-v2-onnx-int8"))
+    parser.add_argument("--eval-set", default=str(ROOT / "scripts" / "embedding_eval_set.json"))
+    parser.add_argument("--with-examples", action="store_true", help="also match every template's own example text")
+    parser.add_argument("--min-agreement", type=float, default=1.0, help="share of top-1 matches that must agree")
+    args = parser.parse_args()
+
+    templates = [template for template in fetch_meme_templates() if template.get("id")]
+    if not templates:
+        raise SystemExit("Template catalog is empty")
+    concepts = json.loads(Path(args.eval_set).read_text())
+    queries = [_normalize_text(concept) for concept in concepts]
+    if args.with_examples:
+        queries += [
+            _normalize_text({"texts": (template.get("example") or {}).get("text", [])})
+            for template in templates
+        ]
+        queries = [query for query in queries if query]
+
+    reference = top1(load_encoder("sentence-transformers", args.onnx_dir), templates, queries)
+    candidate = top1(load_encoder("onnx", args.onnx_dir), templates, queries)
+
+    agree = reference[0] == candidate[0]
+    agreement = float(agree.mean())
+    cosine = (reference[2] * candidate[2]).sum(axis=1)
+    print(f"{len(queries)} queries against {len(templates)} templates")
+    print(f"top-1 agreement: {agreement:.4f} ({int(agree.sum())}/{len(queries)})")
+    print(f"cosine(reference, onnx) per query: mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+    for position in np.flatnonzero(~agree):
+        print(
+            f"  mismatch: {queries[position][:70]!r}\n"
+            f"    reference {templates[reference[0][position]]['id']} ({reference[1][position]:.3f})"
+            f"  onnx {templates[candidate[0][position]]['id']} ({candidate[1][position]:.3f})"
+        )
+
+    if agreement < args.min_agreement:
+        print(f"Top-1 agreement below {args.min_agreement}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
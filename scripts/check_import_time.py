@@ -0,0 +1,67 @@
+"""Measure how long `import app.main` takes in a fresh interpreter and fail when it exceeds a budget.
+
+Usage:
+    python scripts/check_import_time.py [--budget SECONDS] [--runs N] [--top N]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\| (.*)")
+
+
+def measure_once():
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit("import app.main failed")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            # nested imports are indented below their parent
+            modules.append((int(match.group(2)), match.group(3).rstrip()))
+    return elapsed, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("IMPORT_TIME_BUDGET", 3.0)))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports of app.main to print")
+    args = parser.parse_args()
+
+    timings = []
+    modules = []
+    for _ in range(args.runs):
+        elapsed, modules = measure_once()
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"import app.main: median {median:.3f}s over {args.runs} run(s), budget {args.budget:.3f}s")
+    # direct imports of app.main are indented by one level
+    direct = [(cumulative, name.strip()) for cumulative, name in modules if re.match(r"^  \S", name)]
+    for cumulative, name in sorted(direct, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1e6:8.3f}s  {name}")
+
+    if median > args.budget:
+        print("Import time budget exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Export all-MiniLM-L6-v2 to ONNX and quantize it to int8 for EMBEDDING_BACKEND=onnx.
+
+Needs torch, sentence-transformers, onnx and onnxruntime at export time only; serving needs onnxruntime and tokenizers.
+
+Usage:
+    python scripts/export_onnx_embedding.py [--output-dir DIR] [--keep-fp32] [--opset N]
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.services.embedding_backends import MODEL_NAME, ONNX_MANIFEST  # noqa: E402
+
+
+def export(output_dir: Path, opset: int, keep_fp32: bool) -> Path:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    class LastHiddenState(torch.nn.Module):
+        # pooling and normalization stay in numpy, the graph only returns the token embeddings
+        def __init__(self, bert):
+            super().__init__()
+            self.bert = bert
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.bert(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = output_dir / "model.fp32.onnx"
+    int8_path = output_dir / "model.onnx"
+    sample = tokenizer(["a dog looking at another dog", "export"], padding=True, return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer),
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: axes for name in ("input_ids", "attention_mask", "token_type_ids", "last_hidden_state")},
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+
+    # dynamic quantization: int8 weights, activations quantized on the fly, no calibration data needed
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    if not keep_fp32:
+        fp32_path.unlink()
+
+    tokenizer.backend_tokenizer.save(str(output_dir / "tokenizer.json"))
+    manifest = {
+        "source": f"sentence-transformers/{MODEL_NAME}",
+        "model": int8_path.name,
+        "quantization": "dynamic-int8",
+        "max_seq_length": model.max_seq_length,
+        "dimension": model.get_sentence_embedding_dimension(),
+    }
+    (output_dir / ONNX_MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n")
+    print(f"Wrote {int8_path} ({int8_path.stat().st_size / 1e6:.1f} MB)")
+    return int8_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output-dir",
+        default=os.environ.get("EMBEDDING_ONNX_DIR", "models/all-MiniLM-L6-v2-onnx-int8"),
+    )
+    parser.add_argument("--keep-fp32", action="store_true", help="keep the unquantized model.fp32.onnx as well")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(Path(args.output_dir), args.opset, args.keep_fp32)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.config import Config
+from app.services.content_cache import WebsiteContentCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEB_CACHE_DIR", str(tmp_path / "web"))
+    monkeypatch.setenv("WEB_CACHE_MAX_BYTES", "20000")
+    return WebsiteContentCache(Config())
+
+
+def test_concurrent_writes_keep_byte_total_in_sync(cache):
+    def write(number):
+        cache.put(f"https://example.com/{number % 10}", "x" * (100 + number))
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(write, range(400)))
+
+    files = list(cache.cache_dir.glob("*.json"))
+    assert len(files) <= 10
+    assert cache.total_bytes == sum(path.stat().st_size for path in files)
+    assert not list(cache.cache_dir.glob("*.tmp"))
+    entry, fresh = cache.lookup("https://example.com/3")
+    assert fresh and entry["content"].startswith("x")
@@ -0,0 +1,64 @@
+from app.services.content_extractor import extract_text
+
+LANDING_PAGE = """
+<html><head><title>Bean There</title><meta name="description" content="Small batch coffee roasters"></head>
+<body>
+  <nav><ul><li><a href="/">Home</a></li><li><a href="/shop">Shop</a></li><li><a href="/about">About</a></li></ul></nav>
+  <section class="hero">
+    <h1>Coffee worth waking up for</h1>
+    <p>Roasted to order and shipped the same day</p>
+  </section>
+  <section>
+    <h2>Why Bean There</h2>
+    <ul>
+      <li>Single origin beans</li>
+      <li>Free shipping over $30</li>
+      <li>Cancel your subscription anytime</li>
+    </ul>
+  </section>
+  <div class="card"><h3>House Blend</h3><p>Chocolate, caramel and a hint of orange</p></div>
+  <footer><p>Copyright Bean There Coffee Roasters, all rights reserved worldwide.</p></footer>
+</body></html>
+"""
+
+
+def test_landing_page_keeps_headings_and_feature_lists():
+    text = extract_text(LANDING_PAGE)
+    assert "Coffee worth waking up for" in text
+    assert "Single origin beans" in text
+    assert "Free shipping over $30" in text
+    assert "House Blend" in text
+    # menu entries are links, not content
+    assert "Shop" not in text.split("\n")
+
+
+def test_single_unpunctuated_paragraph_falls_back_to_visible_text():
+    tagline = "Handmade leather wallets and belts stitched by hand in our small workshop in Porto Portugal"
+    text = extract_text(f"<html><body><p>{tagline}</p></body></html>")
+    assert tagline in text
+
+
+def test_thin_page_falls_back_to_hero_in_header():
+    html = """
+    <html><body>
+      <header><h2>Acme Bikes</h2><p>Electric bikes for city commuters</p></header>
+      <main><p>Ride more</p></main>
+    </body></html>
+    """
+    text = extract_text(html)
+    assert "Electric bikes for city commuters" in text
+    assert "Ride more" in text
+
+
+def test_article_pages_still_drop_boilerplate():
+    paragraph = ("Our roastery sources beans directly from farmers in Ethiopia, Colombia and Guatemala. "
+                 "Every batch is roasted in small quantities, packed within hours and shipped the same day. ")
+    html = f"""
+    <html><body>
+      <div class="cookie-banner"><p>We use cookies to improve your experience on this website, accept them all.</p></div>
+      <article><p>{paragraph * 2}</p><p>{paragraph}</p></article>
+    </body></html>
+    """
+    text = extract_text(html)
+    assert "Ethiopia" in text
+    assert "cookies" not in text
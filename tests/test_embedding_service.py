@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from app.services.embedding_service import EmbeddingServer, EmbeddingServiceClient
+
+
+class FakeEncoder:
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_idle_shutdown_waits_for_connected_workers_and_exits(tmp_path):
+    socket_path = str(tmp_path / "embedding.sock")
+    server = EmbeddingServer(FakeEncoder(), socket_path, idle_timeout=0.5)
+    stopped = threading.Event()
+    results = {}
+
+    def worker():
+        client = EmbeddingServiceClient(socket_path, timeout=5)
+        while not client.ping():
+            time.sleep(0.05)
+        results["first"] = client.encode(["abc"]).tolist()
+        # a connected worker keeps the service alive past the idle timeout
+        time.sleep(1.5)
+        results["alive_while_connected"] = not stopped.is_set()
+        results["second"] = client.encode("ab").tolist()
+        client._close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    # serve() installs signal handlers, so it runs in the main thread; it has to return once the worker is gone
+    asyncio.run(asyncio.wait_for(server.serve(), timeout=10))
+    stopped.set()
+    thread.join()
+
+    assert results == {"first": [[3.0, 1.0]], "alive_while_connected": True, "second": [2.0, 1.0]}
+    assert not server.connections
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+from app.llm_providers.hedged_provider import Backend, CircuitBreaker, HedgedChatModel, LatencyTracker
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeClient:
+    def __init__(self, name, delay, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        return FakeMessage(self.name)
+
+
+class FakeProvider:
+    def __init__(self, name):
+        self.name = name
+
+    def get_provider_name(self):
+        return self.name
+
+
+def model(*clients, hedge_delay=0.01):
+    backends = [Backend(FakeProvider(client.name), CircuitBreaker(1, 0.05), LatencyTracker(min_samples=1))
+                for client in clients]
+    return HedgedChatModel(backends, list(clients), 95, hedge_delay)
+
+
+def test_half_open_circuit_admits_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    assert breaker.acquire() == (False, False)
+    time.sleep(0.02)
+    assert breaker.acquire() == (True, True)
+    assert breaker.acquire() == (False, False)
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.acquire() == (True, False)
+
+
+def test_cancelled_call_admitted_while_closed_keeps_the_probe_claimed():
+    primary = FakeClient("primary", 0.3)
+    secondary = FakeClient("secondary", 0.001)
+    hedged = model(primary, secondary, hedge_delay=0.02)
+    breaker = hedged.backends[0].breaker
+
+    async def run():
+        # admitted while the circuit is closed, hedged away once the secondary answers
+        call = asyncio.create_task(hedged.ainvoke("hi"))
+        await asyncio.sleep(0.01)
+        breaker.record_failure()
+        breaker.opened_at -= breaker.reset_timeout
+        assert breaker.acquire() == (True, True)
+        await call
+
+    asyncio.run(run())
+    assert breaker.probe_in_flight
+    assert breaker.acquire() == (False, False)
+
+
+def test_concurrent_calls_send_one_probe_to_a_recovering_backend():
+    primary = FakeClient("primary", 0.05)
+    secondary = FakeClient("secondary", 0.001)
+    hedged = model(primary, secondary, hedge_delay=1)
+    hedged.backends[0].breaker.record_failure()
+    time.sleep(0.06)
+
+    async def run():
+        return await asyncio.gather(*(hedged.ainvoke("hi") for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert primary.calls == 1
+    assert sorted(result.content for result in results) == ["primary"] + ["secondary"] * 9
+    assert hedged.backends[0].breaker.state == "closed"
+
+
+def test_hedged_away_calls_record_their_elapsed_time():
+    slow = FakeClient("slow", 0.2)
+    fast = FakeClient("fast", 0.001)
+    hedged = model(slow, fast, hedge_delay=0.02)
+
+    result = asyncio.run(hedged.ainvoke("hi"))
+    assert result.content == "fast"
+    # the cancelled primary counts with the time it had been running
+    assert hedged.backends[0].latency.samples and hedged.backends[0].latency.samples[0] >= 0.02
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.config import Config
+from app.services.image_store import CONTENT_TYPE_SUFFIX, ImageStore
+
+
+class FakeMinio:
+    def __init__(self):
+        self.uploads = []
+        self.lock = threading.Lock()
+
+    def fput_file(self, file_path, object_name, content_type="image/png", part_size=0):
+        with open(file_path, "rb") as uploaded:
+            data = uploaded.read()
+        with self.lock:
+            self.uploads.append((object_name, data, content_type))
+        return False
+
+    async def afile_exists(self, object_name):
+        return False
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("IMAGE_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setenv("IMAGE_VARIANTS", "")
+    type(ImageStore)._instances.pop(ImageStore, None)
+    image_store = ImageStore(Config())
+    image_store.minio_client = FakeMinio()
+    yield image_store
+    type(ImageStore)._instances.pop(ImageStore, None)
+
+
+def test_concurrent_spool_writes_of_one_object(store):
+    names = [f"meme-{number}.png" for number in range(100)]
+
+    def write(number):
+        name = names[number % len(names)]
+        store._write_spool(store.spool_path(name), name.encode(), "image/png")
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(write, range(800)))
+
+    for name in names:
+        assert store.spool_path(name).read_bytes() == name.encode()
+        assert (store.spool_dir / (name + CONTENT_TYPE_SUFFIX)).read_text() == "image/png"
+    assert not list(store.spool_dir.glob("*.tmp"))
+
+
+def test_concurrent_puts_of_one_object_upload_it_once(store):
+    async def run():
+        urls = await asyncio.gather(*(store.put(b"meme", "same.png") for _ in range(20)))
+        await store.stop()
+        return urls
+
+    urls = asyncio.run(run())
+    assert set(urls) == {store.url("same.png")}
+    assert store.minio_client.uploads == [("same.png", b"meme", "image/png")]
+    assert store.counters["failed"] == 0
+    assert not store.spool_path("same.png").exists()
+
+
+def test_spool_file_claimed_by_another_worker_is_skipped(store):
+    path = store.spool_path("claimed.png")
+    store._write_spool(path, b"meme", "image/png")
+    # another worker uploading it holds the claim
+    claim = ImageStore._claim(path)
+    assert claim is not None
+
+    asyncio.run(store._upload_file(path, "claimed.png", "image/png"))
+    assert store.minio_client.uploads == []
+    assert store.counters["claimed_elsewhere"] == 1
+    assert store.counters["failed"] == 0
+
+    claim.close()
+    asyncio.run(store._upload_file(path, "claimed.png", "image/png"))
+    assert store.minio_client.uploads == [("claimed.png", b"meme", "image/png")]
+    assert not path.exists()
+
+
+def test_variant_original(monkeypatch, tmp_path):
+    monkeypatch.setenv("IMAGE_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setenv("IMAGE_VARIANTS", "thumbnail:256,preview:640")
+    type(ImageStore)._instances.pop(ImageStore, None)
+    image_store = ImageStore(Config())
+    type(ImageStore)._instances.pop(ImageStore, None)
+
+    assert image_store.variant_original("abc_thumbnail.webp") == "abc.webp"
+    assert image_store.variant_original(image_store.variant_name("abc.png", "preview")) == "abc.png"
+    assert image_store.variant_original("abc.png") is None
+    assert image_store.variant_original("abc_large.png") is None
@@ -0,0 +1,30 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from app.services.job_runner import JobRunner
+from app.services.job_store import SQLiteJobStore
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_jobs_of_a_dead_worker_are_failed_on_startup(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.save({"id": "orphan", "status": "running", "worker": dead_pid(), "error": None})
+    store.save({"id": "queued-orphan", "status": "queued", "worker": dead_pid(), "error": None})
+    store.save({"id": "live", "status": "running", "worker": os.getpid(), "error": None})
+    store.save({"id": "done", "status": "completed", "worker": dead_pid(), "error": None})
+
+    asyncio.run(JobRunner(None, store)._recover())
+
+    assert store.get("orphan")["status"] == "failed"
+    assert "restart" in store.get("orphan")["error"]
+    assert store.get("queued-orphan")["status"] == "failed"
+    assert store.get("live")["status"] == "running"
+    assert store.get("done")["status"] == "completed"
+    assert [job["id"] for job in store.unfinished()] == ["live"]
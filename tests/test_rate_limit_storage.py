@@ -0,0 +1,41 @@
+import time
+
+from app.services.rate_limit_storage import SQLiteStorage, WeightedQuota
+
+
+def test_incr_adds_the_cost(tmp_path):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path}/limits.sqlite3")
+    assert storage.incr("memes:1.2.3.4", 60, amount=6) == 6
+    assert storage.incr("memes:1.2.3.4", 60, amount=3) == 9
+    assert storage.get("memes:1.2.3.4") == 9
+    assert storage.get("memes:5.6.7.8") == 0
+
+
+def test_incr_starts_a_new_window_after_expiry(tmp_path):
+    storage = SQLiteStorage(f"sqlite:///{tmp_path}/limits.sqlite3")
+    storage.incr("key", 0.2, amount=5)
+    assert storage.get_expiry("key") > time.time()
+    time.sleep(0.3)
+    assert storage.get("key") == 0
+    assert storage.incr("key", 60, amount=2) == 2
+
+
+def test_instances_on_one_file_share_counters(tmp_path):
+    uri = f"sqlite:///{tmp_path}/limits.sqlite3"
+    first, second = SQLiteStorage(uri), SQLiteStorage(uri)
+    first.incr("key", 60, amount=4)
+    assert second.incr("key", 60, amount=1) == 5
+    assert first.get("key") == 5
+    second.clear("key")
+    assert first.get("key") == 0
+
+
+def test_rejected_charge_does_not_drain_the_quota(tmp_path):
+    quota = WeightedQuota("10/minute", f"sqlite:///{tmp_path}/limits.sqlite3", "memes")
+    assert quota.charge("1.2.3.4", 6)
+    assert not quota.charge("1.2.3.4", 6)
+    assert quota.charge("1.2.3.4", 4)
+    assert not quota.charge("1.2.3.4", 1)
+    # other clients and quotas have their own counters
+    assert quota.charge("5.6.7.8", 10)
+    assert WeightedQuota("10/minute", f"sqlite:///{tmp_path}/limits.sqlite3", "bulk-memes").charge("1.2.3.4", 10)
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.config import Config
+from app.services import template_catalog
+from app.services.template_catalog import TemplateCatalog
+
+TEMPLATES = [{"id": "drake", "name": "Drakeposting", "lines": 2, "keywords": ["drake"]}]
+
+
+@pytest.fixture
+def catalog():
+    type(TemplateCatalog)._instances.pop(TemplateCatalog, None)
+    yield TemplateCatalog(Config())
+    type(TemplateCatalog)._instances.pop(TemplateCatalog, None)
+
+
+def test_failed_load_is_retried_with_backoff(catalog, monkeypatch):
+    responses = [[], TEMPLATES]
+    monkeypatch.setattr(template_catalog, "fetch_meme_templates", lambda refresh=False: responses.pop(0))
+
+    asyncio.run(catalog.ensure_loaded())
+    assert not catalog.loaded
+    assert catalog.load_failures == 1
+    # still backing off
+    asyncio.run(catalog.ensure_loaded())
+    assert responses == [TEMPLATES]
+
+    catalog._retry_at = 0
+    asyncio.run(catalog.ensure_loaded())
+    assert catalog.loaded
+    assert catalog.load_failures == 0
+    assert catalog.match("Drake Hotline Bling")[0]["id"] == "drake"
+
+
+def test_refresh_loop_loads_from_cache_once_before_refreshing(catalog, monkeypatch):
+    calls = []
+
+    def fetch(refresh=False):
+        calls.append(refresh)
+        return TEMPLATES
+
+    monkeypatch.setattr(template_catalog, "fetch_meme_templates", fetch)
+    catalog.refresh_interval = 3600
+
+    async def run():
+        catalog.start()
+        # warmup loading at the same time as the loop's first pass
+        await asyncio.gather(asyncio.to_thread(catalog.load), asyncio.sleep(1.2))
+        await catalog.stop()
+
+    asyncio.run(run())
+    assert calls == [False]
+    assert catalog.loaded